@@ -745,3 +745,87 @@ SWAAP_ROUTER_ABI = [
     }
 ]
 
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"}
+                ],
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"}
+                ],
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getBasefee",
+        "outputs": [{"name": "basefee", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getBlockNumber",
+        "outputs": [{"name": "blockNumber", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getChainId",
+        "outputs": [{"name": "chainid", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "addr", "type": "address"}],
+        "name": "getEthBalance",
+        "outputs": [{"name": "balance", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+# Registry of the ABIs above keyed by name (without the _ABI suffix), so contract
+# instances can be cached per (address, abi_key) — ABI lists themselves aren't hashable.
+ABIS = {
+    'MINIMAL_V2_PAIR': MINIMAL_V2_PAIR_ABI,
+    'V2_FACTORY': V2_FACTORY_ABI,
+    'ERC20': ERC20_ABI,
+    'UNISWAP_V2_ROUTER': UNISWAP_V2_ROUTER_ABI,
+    'UNISWAP_V3_ROUTER': UNISWAP_V3_ROUTER_ABI,
+    'UNISWAP_V3_QUOTER': UNISWAP_V3_QUOTER_ABI,
+    'UNISWAP_V3_POOL': UNISWAP_V3_POOL_ABI,
+    'UNISWAP_V3_FACTORY': UNISWAP_V3_FACTORY_ABI,
+    'PANCAKE_V3_ROUTER': PANCAKE_V3_ROUTER_ABI,
+    'PANCAKE_V3_QUOTER': PANCAKE_V3_QUOTER_ABI,
+    'PANCAKE_V3_POOL': PANCAKE_V3_POOL_ABI,
+    'PANCAKE_V3_FACTORY': PANCAKE_V3_FACTORY_ABI,
+    'SOLIDLY_ROUTER': SOLIDLY_ROUTER_ABI,
+    'SOLIDLY_FACTORY': SOLIDLY_FACTORY_ABI,
+    'SOLIDLY_PAIR': SOLIDLY_PAIR_ABI,
+    'ONEINCH_V6_ROUTER': ONEINCH_V6_ROUTER_ABI,
+    'ALIENBASE_V2_ROUTER': ALIENBASE_V2_ROUTER_ABI,
+    'MAVERICK_ROUTER': MAVERICK_ROUTER_ABI,
+    'BALANCER_POOL': BALANCER_POOL_ABI,
+    'BALANCER_V2_ROUTER': BALANCER_V2_ROUTER_ABI,
+    'SWAAP_POOL': SWAAP_POOL_ABI,
+    'SWAAP_ROUTER': SWAAP_ROUTER_ABI,
+    'MULTICALL3': MULTICALL3_ABI,
+}
@@ -1,8 +1,12 @@
 import os
 import json
 import logging
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from web3 import Web3
+from web3.providers.rpc.utils import ExceptionRetryConfiguration, REQUEST_RETRY_ALLOWLIST
+from rpc_pool import FastJsonHTTPProvider, RpcPoolProvider
 
 # --- Load Configuration from .env file ---
 load_dotenv()
@@ -26,19 +30,42 @@ LIQUIDITY_IMPACT_THRESHOLD = 0.1   # max trade size as fraction of pool liquidit
 BALANCE_CHECK_RETRIES = 5          # retries when waiting for balance change
 BALANCE_CHECK_DELAY = 1.0          # seconds between balance check retries
 TX_RECEIPT_TIMEOUT = 120           # seconds to wait for transaction receipt
+GAS_LIMIT_HEADROOM = 1.3           # gas limit = highest observed gasUsed of the route * headroom
+RECEIPT_POLL_INITIAL_DELAY = 0.5   # seconds before the first receipt poll (nothing is mined sooner)
+RECEIPT_POLL_INTERVAL = 0.25       # seconds between the first receipt polls, doubled after each miss
+RECEIPT_POLL_MAX_INTERVAL = 2.0    # seconds, receipt poll interval cap (one Base block)
 ON_CHAIN_POLL_INTERVAL = float(os.getenv("ON_CHAIN_POLL_INTERVAL", 0.5))  # seconds between on-chain price polls
 
+# --- RPC Transport ---
+RPC_POOL_CONNECTIONS = 16          # number of pooled connections per host
+RPC_POOL_MAXSIZE = 16              # max sockets kept alive in the pool
+RPC_REQUEST_TIMEOUT = 10           # seconds before an HTTP RPC request times out
+RPC_MAX_RETRIES = 4                # retries for idempotent reads before giving up
+RPC_BACKOFF_BASE = 0.1             # seconds, floor of the jittered retry delay
+RPC_BACKOFF_MAX = 8.0              # seconds, cap of the jittered retry delay
+RPC_ENDPOINT_COOLDOWN = 30.0       # seconds a failing endpoint is skipped when several are configured
+RPC_TRANSPORT_RETRIES = 2          # quick same-endpoint retries of a read on a dropped connection or timeout
+
 # --- Blockchain Configuration ---
 BASE_CHAIN_ID = os.getenv("BASE_CHAIN_ID")
 BASE_RPC_URL = os.getenv("BASE_RPC_URL")
+IPC_PATH = os.getenv("IPC_PATH")  # local node IPC socket, preferred over BASE_RPC_URL when set
+WRITE_RPC_URL = os.getenv("WRITE_RPC_URL")  # optional dedicated endpoint for sending transactions
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 BOT_WALLET = os.getenv("BOT_WALLET")
+# Multicall3 is deployed at the same address on Base and most EVM chains
+MULTICALL3_ADDRESS_RAW = os.getenv("MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+# Optional JSON file persisting immutable token metadata (decimals, name, symbol) across restarts
+TOKEN_CACHE_PATH = os.getenv("TOKEN_CACHE_PATH")
 
 # --- Trading Configuration ---
 BASE_CURRENCY_ADDRESS_RAW = os.getenv("BASE_CURRENCY_ADDRESS")
 TRADE_AMOUNT_BASE_TOKEN = float(os.getenv("TRADE_AMOUNT_BASE_TOKEN", 0.0))
 SLIPPAGE_TOLERANCE_PERCENT = float(os.getenv("SLIPPAGE_TOLERANCE_PERCENT", 1.0))
 MAX_GAS_LIMIT = int(os.getenv("MAX_GAS_LIMIT", 500000))
+# Send the EOA sell leg (sized at the buy's minimum output) right behind the buy instead of
+# waiting for the buy receipt
+PIPELINE_SELL_LEG = os.getenv("PIPELINE_SELL_LEG", "false").lower() == "true"
 
 # --- DEX Router Configuration Loading with Debugging ---
 dex_routers_env_string = os.getenv("DEX_ROUTERS")
@@ -48,27 +75,83 @@ try:
     # Use json.loads for safer and more standard parsing of the DEX_ROUTERS string
     DEX_ROUTERS_RAW = json.loads(dex_routers_env_string or '{}')
 except json.JSONDecodeError as e:
-    print(f"CRITICAL: Could not parse DEX_ROUTERS from .env file. Please ensure it is valid JSON. Error: {e}")
+    logging.critical(f"Could not parse DEX_ROUTERS from .env file. Please ensure it is valid JSON. Error: {e}")
     DEX_ROUTERS_RAW = {}
 
 # --- Web3 Setup ---
-# Determine the correct Web3 provider based on the BASE_RPC_URL scheme.
-if not BASE_RPC_URL:
+# Prefer a local node over IPC when configured; otherwise determine the
+# correct Web3 provider based on the BASE_RPC_URL scheme.
+if not IPC_PATH and not BASE_RPC_URL:
     raise ValueError(
-        "BASE_RPC_URL is not set. Please provide a websocket or http(s) RPC URL in your .env file."
+        "BASE_RPC_URL is not set. Please provide a websocket or http(s) RPC URL (or IPC_PATH) in your .env file."
     )
 
-if BASE_RPC_URL.startswith(("ws://", "wss://")):
+
+def _pooled_session():
+    """requests session keeping RPC_POOL_MAXSIZE keep-alive connections open per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=RPC_POOL_CONNECTIONS, pool_maxsize=RPC_POOL_MAXSIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+
+def _read_retry_configuration():
+    """
+    Transport retries for idempotent reads only. Most reads (receipt polls, multicalls, price
+    polls, allowance checks) are not wrapped in trading.resilient_rpc_call, so they rely on this
+    to survive a dropped connection. The count stays small so wrapped calls don't stack long
+    delays. eth_sendRawTransaction is left out: after a timeout the transaction may already be
+    broadcast, and sends go to the node once. HTTP error statuses are not retried here.
+    """
+    return ExceptionRetryConfiguration(
+        errors=(ConnectionError, requests.ConnectionError, requests.Timeout),
+        retries=RPC_TRANSPORT_RETRIES + 1,
+        backoff_factor=RPC_BACKOFF_BASE,
+        method_allowlist=[method for method in REQUEST_RETRY_ALLOWLIST
+                          if method not in ('eth_sendRawTransaction', 'eth_sign', 'eth_signTypedData')],
+    )
+
+
+if IPC_PATH:
+    # Local node socket: no network stack, sub-10ms RPC round-trips
+    w3 = Web3(Web3.IPCProvider(IPC_PATH, timeout=RPC_REQUEST_TIMEOUT))
+elif BASE_RPC_URL.startswith(("ws://", "wss://")):
     # Use WebsocketProvider for websocket endpoints
     w3 = Web3(Web3.LegacyWebSocketProvider(BASE_RPC_URL))
 elif BASE_RPC_URL.startswith(("http://", "https://")):
-    # Use HTTPProvider when provided with an http(s) endpoint
-    w3 = Web3(Web3.HTTPProvider(BASE_RPC_URL))
+    # Use HTTPProvider when provided with an http(s) endpoint, backed by a pooled
+    # keep-alive session so each RPC reuses an open TCP/TLS connection.
+    rpc_urls = [url.strip() for url in BASE_RPC_URL.split(",") if url.strip()]
+    if len(rpc_urls) > 1:
+        # Several endpoints: route each request to the fastest healthy one, failing over on errors
+        w3 = Web3(RpcPoolProvider(rpc_urls, cooldown=RPC_ENDPOINT_COOLDOWN, session=_pooled_session(),
+                                  request_kwargs={'timeout': RPC_REQUEST_TIMEOUT}))
+    else:
+        w3 = Web3(FastJsonHTTPProvider(BASE_RPC_URL, session=_pooled_session(),
+                                       request_kwargs={'timeout': RPC_REQUEST_TIMEOUT},
+                                       exception_retry_configuration=_read_retry_configuration()))
 else:
     raise ValueError(
         "Invalid BASE_RPC_URL. Must start with ws://, wss://, http:// or https://"
     )
 
+# Transactions go out over their own connection so a send never queues behind
+# price-polling reads; without WRITE_RPC_URL both share the read provider.
+if not WRITE_RPC_URL:
+    w3_write = w3
+elif WRITE_RPC_URL.startswith(("ws://", "wss://")):
+    w3_write = Web3(Web3.LegacyWebSocketProvider(WRITE_RPC_URL, websocket_timeout=RPC_REQUEST_TIMEOUT))
+elif WRITE_RPC_URL.startswith(("http://", "https://")):
+    w3_write = Web3(FastJsonHTTPProvider(WRITE_RPC_URL, session=_pooled_session(),
+                                         request_kwargs={'timeout': RPC_REQUEST_TIMEOUT},
+                                         exception_retry_configuration=_read_retry_configuration()))
+else:
+    raise ValueError(
+        "Invalid WRITE_RPC_URL. Must start with ws://, wss://, http:// or https://"
+    )
+
 # --- Address Checksumming ---
 TOKEN_ADDRESSES = {}
 if TOKEN_ADDRESSES_RAW:
@@ -79,6 +162,7 @@ if TOKEN_ADDRESSES_RAW:
                 TOKEN_ADDRESSES[name.strip()] = w3.to_checksum_address(addr.strip())
 
 BASE_CURRENCY_ADDRESS = w3.to_checksum_address(BASE_CURRENCY_ADDRESS_RAW) if BASE_CURRENCY_ADDRESS_RAW else None
+MULTICALL3_ADDRESS = w3.to_checksum_address(MULTICALL3_ADDRESS_RAW)
 
 DEX_ROUTERS = {}
 for dex, info in DEX_ROUTERS_RAW.items():
@@ -93,6 +177,8 @@ for dex, info in DEX_ROUTERS_RAW.items():
         router_data['factory'] = w3.to_checksum_address(info['factory'])
     if 'quoter' in info:
         router_data['quoter'] = w3.to_checksum_address(info['quoter'])
+    if 'feeBps' in info:
+        router_data['feeBps'] = int(info['feeBps'])  # V2 swap fee, when not UniswapV2's 30 bps
     DEX_ROUTERS[dex] = router_data
 
 # --- Account Setup ---
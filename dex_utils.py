@@ -1,28 +1,134 @@
+import os
+import json
 import time
 import logging
-from config import (w3, account, PRIVATE_KEY, MAX_GAS_LIMIT, DEX_ROUTERS, BASE_CURRENCY_ADDRESS,
-                    TRADE_AMOUNT_BASE_TOKEN, TX_RECEIPT_TIMEOUT, MAX_PRICE_IMPACT_PCT)
-from abi import (ERC20_ABI, SOLIDLY_PAIR_ABI, MINIMAL_V2_PAIR_ABI, UNISWAP_V3_POOL_ABI,
-                 PANCAKE_V3_POOL_ABI, V2_FACTORY_ABI, SOLIDLY_FACTORY_ABI,
-                 UNISWAP_V3_FACTORY_ABI, PANCAKE_V3_FACTORY_ABI)
+import functools
+from eth_utils import function_signature_to_4byte_selector
+from eth_utils.abi import get_abi_output_types
+from config import (w3, account, MAX_GAS_LIMIT, DEX_ROUTERS, BASE_CURRENCY_ADDRESS,
+                    TRADE_AMOUNT_BASE_TOKEN, TX_RECEIPT_TIMEOUT, MAX_PRICE_IMPACT_PCT, MULTICALL3_ADDRESS,
+                    BASE_CHAIN_ID, TOKEN_CACHE_PATH)
+from abi import ABIS
+
+@functools.lru_cache(maxsize=1024)
+def get_contract(address, abi_key):
+    """Returns a contract instance for address with the ABI registered under abi_key, cached per pair."""
+    return w3.eth.contract(address=address, abi=ABIS[abi_key])
+
+def build_multicall(calls):
+    """
+    Wraps bound contract calls (e.g. token.functions.balanceOf(addr)) into a single
+    Multicall3.aggregate3 call, allowing each one to fail individually.
+    """
+    aggregator = get_contract(MULTICALL3_ADDRESS, 'MULTICALL3')
+    return aggregator.functions.aggregate3(
+        [(fn.address, True, fn._encode_transaction_data()) for fn in calls]
+    )
+
+def decode_multicall(calls, results):
+    """
+    Decodes aggregate3 results against the calls they came from.
+    Returns each call's result in order (unwrapped when it has a single output),
+    or None for calls that reverted or hit an address without code.
+    """
+    decoded = []
+    for fn, (success, return_data) in zip(calls, results):
+        if not success or not return_data:
+            decoded.append(None)
+            continue
+        output_types = get_abi_output_types(fn.abi)
+        values = w3.codec.decode(output_types, return_data)
+        # Checksum addresses as web3's own .call() does
+        values = [w3.to_checksum_address(v) if t == 'address' else v for t, v in zip(output_types, values)]
+        decoded.append(values[0] if len(values) == 1 else values)
+    return decoded
+
+def multicall(calls, block_identifier='latest'):
+    """Runs bound contract calls in one eth_call, so every result is read from the same block."""
+    results = build_multicall(calls).call(block_identifier=block_identifier)
+    return decode_multicall(calls, results)
+
+# Token metadata persisted to TOKEN_CACHE_PATH, keyed by "chainId:address", so a restart
+# doesn't re-read what can never change. Disabled when TOKEN_CACHE_PATH is unset.
+_token_disk_cache = None
+
+def _load_token_disk_cache():
+    global _token_disk_cache
+    if _token_disk_cache is None:
+        try:
+            with open(TOKEN_CACHE_PATH) as f:
+                _token_disk_cache = json.load(f)
+        except (OSError, ValueError):
+            _token_disk_cache = {}
+    return _token_disk_cache
+
+def _cached_token_field(token_address, field):
+    """Returns a persisted metadata field for a token, or None."""
+    if not TOKEN_CACHE_PATH:
+        return None
+    return _load_token_disk_cache().get(f"{BASE_CHAIN_ID}:{token_address}", {}).get(field)
+
+def _persist_token_fields(token_address, **fields):
+    """Records metadata fields for a token in the disk cache."""
+    if not TOKEN_CACHE_PATH:
+        return
+    cache = _load_token_disk_cache()
+    cache.setdefault(f"{BASE_CHAIN_ID}:{token_address}", {}).update(fields)
+    try:
+        tmp_path = f"{TOKEN_CACHE_PATH}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, TOKEN_CACHE_PATH)
+    except OSError as e:
+        logging.warning(f"Could not write token cache {TOKEN_CACHE_PATH}: {e}")
+
+@functools.lru_cache(maxsize=1)
+def get_chain_id():
+    """The connected chain's id, read once per process."""
+    return w3.eth.chain_id
 
 # Cache for token decimals — immutable on-chain, no need to re-fetch
 _decimals_cache = {}
 
 def get_decimals(token_address):
-    """Returns decimals for a token, caching the result."""
+    """Returns decimals for a token, caching the result in memory and on disk."""
     if token_address not in _decimals_cache:
-        contract = w3.eth.contract(address=token_address, abi=ERC20_ABI)
-        _decimals_cache[token_address] = contract.functions.decimals().call()
+        decimals = _cached_token_field(token_address, 'decimals')
+        if decimals is None:
+            contract = get_contract(token_address, 'ERC20')
+            decimals = contract.functions.decimals().call()
+            _persist_token_fields(token_address, decimals=decimals)
+        _decimals_cache[token_address] = decimals
     return _decimals_cache[token_address]
 
+# Cache for 10**decimals per token — the wei-per-token multiplier never changes
+_unit_cache = {}
+
+def get_token_unit(token_address):
+    """Returns 10**decimals (wei per whole token) for a token, caching the result."""
+    if token_address not in _unit_cache:
+        _unit_cache[token_address] = 10 ** get_decimals(token_address)
+    return _unit_cache[token_address]
+
+# Cache for token name/symbol — fixed at deployment, and looked up again by every discovery pass
+_token_info_cache = {}
+
 def get_token_info(token_address):
-    """Fetches name and symbol for a given token address."""
+    """Fetches name and symbol for a given token address in one multicall, caching the result."""
+    if token_address in _token_info_cache:
+        return _token_info_cache[token_address]
+    symbol, name = _cached_token_field(token_address, 'symbol'), _cached_token_field(token_address, 'name')
+    if symbol is not None and name is not None:
+        _token_info_cache[token_address] = {'symbol': symbol, 'name': name}
+        return _token_info_cache[token_address]
     try:
-        token_contract = w3.eth.contract(address=token_address, abi=ERC20_ABI)
-        symbol = token_contract.functions.symbol().call()
-        name = token_contract.functions.name().call()
-        return {'symbol': symbol, 'name': name}
+        token_contract = get_contract(token_address, 'ERC20')
+        symbol, name = multicall([token_contract.functions.symbol(), token_contract.functions.name()])
+        if symbol is None or name is None:
+            raise ValueError("symbol() or name() reverted")
+        _token_info_cache[token_address] = {'symbol': symbol, 'name': name}
+        _persist_token_fields(token_address, symbol=symbol, name=name)
+        return _token_info_cache[token_address]
     except Exception as e:
         logging.warning(f"  - Could not fetch name/symbol for {token_address}. Error: {str(e)[:100]}")
         symbol_fallback = f"[{token_address[-6:]}]"
@@ -39,7 +145,7 @@ def find_router_info(dex_id, routers, pair_address=None):
             possible_matches.append(info)
 
     if not possible_matches:
-        logging.debug(f"No router match found for dex_id '{dex_id}'. Available router keys: {list(routers.keys())}")
+        logging.debug("No router match found for dex_id '%s'. Available router keys: %s", dex_id, list(routers))
         return None
 
     if len(possible_matches) == 1:
@@ -47,7 +153,7 @@ def find_router_info(dex_id, routers, pair_address=None):
 
     if pair_address:
         try:
-            pair_contract = w3.eth.contract(address=pair_address, abi=MINIMAL_V2_PAIR_ABI)
+            pair_contract = get_contract(pair_address, 'MINIMAL_V2_PAIR')
             on_chain_factory = pair_contract.functions.factory().call()
 
             for info in possible_matches:
@@ -55,13 +161,27 @@ def find_router_info(dex_id, routers, pair_address=None):
                     return info
             logging.warning(f"  - Could not find a router with factory {on_chain_factory} among candidates.")
         except Exception as e:
-            logging.debug(f"Could not query factory for pair {pair_address} to disambiguate router: {e}")
+            logging.debug("Could not query factory for pair %s to disambiguate router: %s", pair_address, e)
 
-    logging.debug(f"Found multiple possible routers for '{dex_id}'. Selecting highest version as fallback.")
+    logging.debug("Found multiple possible routers for '%s'. Selecting highest version as fallback.", dex_id)
     possible_matches.sort(key=lambda x: x.get('version', 0), reverse=True)
     return possible_matches[0]
 
+# Pool -> router resolution never changes, and disambiguating it can cost a factory() RPC
+_pool_router_cache = {}
+
+def get_pool_router_info(pool):
+    """find_router_info for a discovered pool against DEX_ROUTERS, cached per (dex, pairAddress)."""
+    key = (pool['dex'], pool.get('pairAddress'))
+    if key not in _pool_router_cache:
+        router_info = find_router_info(pool['dex'], DEX_ROUTERS, pair_address=pool.get('pairAddress'))
+        if router_info is None:
+            return None
+        _pool_router_cache[key] = router_info
+    return _pool_router_cache[key]
+
 # --- helpers ---------------------------------------------------------------
+
 def _gas_params(w3, bump_pct: int = 0):
     """Return (priority, max) gas fees, optionally bumped by bump_pct%."""
     prio = w3.eth.max_priority_fee
@@ -80,18 +200,31 @@ def _build_payload(w3, from_addr, nonce, bump=0):
         "maxPriorityFeePerGas": prio,
         "maxFeePerGas": max_fee,
         "gas": MAX_GAS_LIMIT,
-        "chainId": w3.eth.chain_id,
+        "chainId": get_chain_id(),
     }
 
 # --- main approval routine --------------------------------------------------
 
+MAX_UINT256 = 2**256 - 1
+# Allowances at or above this are treated as unlimited: tokens don't meaningfully
+# decrement them, so once seen they never need to be re-checked on-chain.
+UNLIMITED_ALLOWANCE_THRESHOLD = 2**255
+
+# (token, spender) pairs known to hold an unlimited allowance
+_unlimited_allowances = set()
+
 def check_and_approve_token(token_address: str,
                             spender_address: str,
                             amount_to_approve_wei: int):
     if not all([account, token_address, spender_address]):
         return
 
-    token = w3.eth.contract(address=token_address, abi=ERC20_ABI)
+    allowance_key = (token_address, spender_address)
+    if allowance_key in _unlimited_allowances:
+        logging.debug("Allowance for %s on %s is cached as unlimited.", spender_address, token_address)
+        return
+
+    token = get_contract(token_address, 'ERC20')
     allowance = token.functions.allowance(account.address,
                                           spender_address).call()
     logging.info(
@@ -100,6 +233,8 @@ def check_and_approve_token(token_address: str,
 
     if allowance >= amount_to_approve_wei:
         logging.info("Sufficient allowance already set.")
+        if allowance >= UNLIMITED_ALLOWANCE_THRESHOLD:
+            _unlimited_allowances.add(allowance_key)
         return
 
     try:
@@ -112,7 +247,7 @@ def check_and_approve_token(token_address: str,
             payload = _build_payload(w3, account.address, base_nonce, bump)
             reset_tx = token.functions.approve(spender_address, 0
                           ).build_transaction(payload)
-            signed = w3.eth.account.sign_transaction(reset_tx, PRIVATE_KEY)
+            signed = account.sign_transaction(reset_tx)
             tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
             w3.eth.wait_for_transaction_receipt(tx_hash, timeout=TX_RECEIPT_TIMEOUT)
             logging.info(f"Reset tx mined: {tx_hash.hex()}")
@@ -125,10 +260,12 @@ def check_and_approve_token(token_address: str,
         approve_tx = token.functions.approve(spender_address,
                                              amount_to_approve_wei
                         ).build_transaction(payload)
-        signed = w3.eth.account.sign_transaction(approve_tx, PRIVATE_KEY)
+        signed = account.sign_transaction(approve_tx)
         tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
-        w3.eth.wait_for_transaction_receipt(tx_hash, timeout=TX_RECEIPT_TIMEOUT)
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=TX_RECEIPT_TIMEOUT)
         logging.info(f"Approve tx mined: {tx_hash.hex()}")
+        if receipt['status'] == 1 and amount_to_approve_wei >= UNLIMITED_ALLOWANCE_THRESHOLD:
+            _unlimited_allowances.add(allowance_key)
 
     except Exception as err:
         logging.error(f"Approval flow failed: {err}")
@@ -136,15 +273,97 @@ def check_and_approve_token(token_address: str,
 
 # --- on-chain price functions -----------------------------------------------
 
-def _get_v2_pool_price(pool_address, token_in_address, token_out_address, token_in_decimals, token_out_decimals):
+def get_v2_amount_out(amount_in, reserve_in, reserve_out, fee_bps=30):
+    """Constant-product output of a V2 swap, same integer math as UniswapV2Library.getAmountOut."""
+    amount_in_with_fee = amount_in * (10_000 - fee_bps)
+    return amount_in_with_fee * reserve_out // (reserve_in * 10_000 + amount_in_with_fee)
+
+
+def get_v3_spot_amount_out(amount_in, sqrt_price_x96, zero_for_one, fee=0):
+    """
+    Output of a V3 swap at the current sqrtPriceX96, in integer wei math (no tick crossing).
+    fee is the pool fee in hundredths of a bip (500 = 0.05 %), deducted from the input.
+    """
+    amount_in = amount_in * (1_000_000 - fee) // 1_000_000
+    price_x192 = sqrt_price_x96 * sqrt_price_x96
+    if zero_for_one:
+        return amount_in * price_x192 >> 192
+    return (amount_in << 192) // price_x192
+
+
+# --- raw pool reads ---------------------------------------------------------
+# The price poll reads every pool each ON_CHAIN_POLL_INTERVAL, so it sends precomputed
+# calldata straight to eth_call instead of building ContractFunction wrappers per read.
+GET_RESERVES_SELECTOR = function_signature_to_4byte_selector("getReserves()")
+SLOT0_SELECTOR = function_signature_to_4byte_selector("slot0()")
+TOKEN0_SELECTOR = function_signature_to_4byte_selector("token0()")
+LIQUIDITY_SELECTOR = function_signature_to_4byte_selector("liquidity()")
+AGGREGATE3_SELECTOR = function_signature_to_4byte_selector("aggregate3((address,bool,bytes)[])")
+
+# token0 of a pool never changes, so each pool's is read once
+_token0_cache = {}
+
+def _raw_call(address, data):
+    """eth_call of precomputed calldata (a no-argument selector or an aggregate3), returning the raw return data."""
+    return w3.eth.call({'to': address, 'data': data})
+
+def _raw_aggregate(address, selectors):
+    """
+    Return data of several no-argument view functions of one contract, read in a single
+    Multicall3.aggregate3 eth_call. Any failing call reverts the whole read.
+    """
+    data = AGGREGATE3_SELECTOR + w3.codec.encode(['(address,bool,bytes)[]'],
+                                                 [[(address, False, selector) for selector in selectors]])
+    results = w3.codec.decode(['(bool,bytes)[]'], _raw_call(MULTICALL3_ADDRESS, data))[0]
+    return [return_data for _, return_data in results]
+
+def _word(data, index):
+    """The index-th 32-byte word of ABI return data as an unsigned int."""
+    return int.from_bytes(data[32 * index:32 * (index + 1)], 'big')
+
+def _cache_token0(pool_address, data):
+    token0 = _token0_cache[pool_address] = w3.to_checksum_address(data[12:32])
+    return token0
+
+def _read_token0(pool_address):
+    token0 = _token0_cache.get(pool_address)
+    if token0 is None:
+        token0 = _cache_token0(pool_address, _raw_call(pool_address, TOKEN0_SELECTOR))
+    return token0
+
+def _read_reserves(pool_address):
+    """(reserve0, reserve1) of a V2-style pair."""
+    data = _raw_call(pool_address, GET_RESERVES_SELECTOR)
+    return _word(data, 0), _word(data, 1)
+
+def _read_v3_state(pool_address, with_liquidity=False):
+    """
+    (sqrtPriceX96, token0, liquidity or None) of a V3 pool in one eth_call: slot0 alone once
+    token0 is cached, otherwise slot0, token0 and (with_liquidity) liquidity in one aggregate3.
+    sqrtPriceX96 is the first slot0 field in both Uniswap and Pancake V3 pools.
+    """
+    token0 = _token0_cache.get(pool_address)
+    selectors = [SLOT0_SELECTOR] + ([TOKEN0_SELECTOR] if token0 is None else []) + \
+                ([LIQUIDITY_SELECTOR] if with_liquidity else [])
+    if len(selectors) == 1:
+        return _word(_raw_call(pool_address, SLOT0_SELECTOR), 0), token0, None
+    results = dict(zip(selectors, _raw_aggregate(pool_address, selectors)))
+    if token0 is None:
+        token0 = _cache_token0(pool_address, results[TOKEN0_SELECTOR])
+    liquidity = _word(results[LIQUIDITY_SELECTOR], 0) if with_liquidity else None
+    return _word(results[SLOT0_SELECTOR], 0), token0, liquidity
+
+
+def _get_v2_pool_price(pool_address, token_in_address, token_out_address, token_in_decimals, token_out_decimals,
+                       pool_state=None):
     """
     Retrieves the spot price from a Uniswap V2-style pool using getReserves.
     Returns the price of token_in in terms of token_out (how much token_out per token_in).
+    If pool_state is given, the oriented reserves are stored in it as reserve_in/reserve_out.
     """
     try:
-        pair = w3.eth.contract(address=pool_address, abi=MINIMAL_V2_PAIR_ABI)
-        reserve0, reserve1, _ = pair.functions.getReserves().call()
-        token0 = w3.to_checksum_address(pair.functions.token0().call())
+        reserve0, reserve1 = _read_reserves(pool_address)
+        token0 = _read_token0(pool_address)
 
         token_in_address = w3.to_checksum_address(token_in_address)
 
@@ -158,10 +377,14 @@ def _get_v2_pool_price(pool_address, token_in_address, token_out_address, token_
         if reserve_in == 0:
             return None
 
+        if pool_state is not None:
+            pool_state['reserve_in'] = reserve_in
+            pool_state['reserve_out'] = reserve_out
+
         # price = (reserve_out / 10^dec_out) / (reserve_in / 10^dec_in)
         price = (reserve_out / (10 ** dec_out)) / (reserve_in / (10 ** dec_in))
 
-        logging.debug(f"V2 pool {pool_address} price for {token_in_address}: {price}")
+        logging.debug("V2 pool %s price for %s: %s", pool_address, token_in_address, price)
         return price
     except Exception as e:
         logging.warning(f"Could not get price from V2 pool {pool_address} via getReserves. Error: {e}")
@@ -175,7 +398,7 @@ def _get_solidly_pool_price(pool_address: str, token_in_address: str, token_out_
     Returns the price of token_in in terms of token_out.
     """
     try:
-        pool_contract = w3.eth.contract(address=pool_address, abi=SOLIDLY_PAIR_ABI)
+        pool_contract = get_contract(pool_address, 'SOLIDLY_PAIR')
 
         amount_in = int(TRADE_AMOUNT_BASE_TOKEN * (10 ** token_in_decimals))
 
@@ -188,26 +411,24 @@ def _get_solidly_pool_price(pool_address: str, token_in_address: str, token_out_
         amount_out_wei = prices_out[0]
         price = (amount_out_wei / (10 ** token_out_decimals))
 
-        logging.debug(f"Solidly pool {pool_address} price for {token_in_address}: {price} {token_out_address}")
+        logging.debug("Solidly pool %s price for %s: %s %s", pool_address, token_in_address, price, token_out_address)
         return price
     except Exception as e:
         logging.warning(f"Could not get price from Solidly pool {pool_address} via `prices` function. Error: {e}")
         return None
 
 
-def _get_uniswap_or_pancakeswap_pool_price(pool_address: str, router_type: str, token_in_address: str, token_out_address: str, token_in_decimals: int, token_out_decimals: int):
+def _get_uniswap_or_pancakeswap_pool_price(pool_address: str, router_type: str, token_in_address: str, token_out_address: str, token_in_decimals: int, token_out_decimals: int,
+                                           pool_state=None):
     """
     Retrieves the spot price from a Uniswap/Pancake V3 pool using `slot0`.
     Returns the price of token_in in terms of token_out.
+    If pool_state is given, sqrtPriceX96, whether token_in is token0, the in-range liquidity and
+    the time of the read (scanned_at) are stored in it.
     """
     try:
-        if router_type == 'pancakeswap_v3':
-            pool_abi = PANCAKE_V3_POOL_ABI
-        else:
-            pool_abi = UNISWAP_V3_POOL_ABI
-
-        pool_contract = w3.eth.contract(address=pool_address, abi=pool_abi)
-        sqrt_price_x96, *_ = pool_contract.functions.slot0().call()
+        # slot0 differs between Uniswap and Pancake only after sqrtPriceX96, so one reader serves both
+        sqrt_price_x96, pool_token0_addr, liquidity = _read_v3_state(pool_address, with_liquidity=pool_state is not None)
 
         if sqrt_price_x96 == 0:
             logging.warning(f"V3 pool {pool_address} slot0.sqrtPriceX96 is 0. Pool may not be initialized.")
@@ -215,9 +436,14 @@ def _get_uniswap_or_pancakeswap_pool_price(pool_address: str, router_type: str,
 
         price_raw_t0_t1 = (sqrt_price_x96 / 2**96) ** 2
 
-        pool_token0_addr = w3.to_checksum_address(pool_contract.functions.token0().call())
         token_in_address = w3.to_checksum_address(token_in_address)
 
+        if pool_state is not None:
+            pool_state['sqrtPriceX96'] = sqrt_price_x96
+            pool_state['token_is_token0'] = pool_token0_addr == token_in_address
+            pool_state['liquidity'] = liquidity
+            pool_state['scanned_at'] = time.time()
+
         if pool_token0_addr == token_in_address:
             decimals_t0 = token_in_decimals
             decimals_t1 = token_out_decimals
@@ -235,7 +461,7 @@ def _get_uniswap_or_pancakeswap_pool_price(pool_address: str, router_type: str,
                 return None
             price = 1 / price_t0_t1_adj
 
-        logging.debug(f"Uniswap/Pancake V3 pool {pool_address} price for {token_in_address}: {price} {token_out_address}")
+        logging.debug("Uniswap/Pancake V3 pool %s price for %s: %s %s", pool_address, token_in_address, price, token_out_address)
         return price
 
     except Exception as e:
@@ -243,10 +469,13 @@ def _get_uniswap_or_pancakeswap_pool_price(pool_address: str, router_type: str,
         return None
 
 
-def get_lp_price(pool, token_address):
-    """Get on-chain price for a pool. Returns price of token in terms of BASE_CURRENCY, or None."""
-    dex_name = pool['dex']
-    router_info = find_router_info(dex_name, DEX_ROUTERS, pair_address=pool.get('pairAddress'))
+def get_lp_price(pool, token_address, pool_state=None):
+    """
+    Get on-chain price for a pool. Returns price of token in terms of BASE_CURRENCY, or None.
+    If pool_state is given, pool data read along the way (V2 reserves in token → base orientation,
+    V3 sqrtPriceX96 and liquidity) is stored in it so the trade path can quote without another RPC.
+    """
+    router_info = get_pool_router_info(pool)
     if not router_info:
         return None
     router_type = router_info.get('type', 'uniswap_v2')
@@ -263,10 +492,11 @@ def get_lp_price(pool, token_address):
         else:
             # V2 forks: uniswap_v2, sushiswap, baseswap, alienbase
             return _get_v2_pool_price(pool['pairAddress'], token_address, BASE_CURRENCY_ADDRESS,
-                                      quote_decimals, base_decimals)
+                                      quote_decimals, base_decimals, pool_state=pool_state)
     elif router_info['version'] == 3:
         return _get_uniswap_or_pancakeswap_pool_price(pool['pairAddress'], router_type, token_address,
-                                                       BASE_CURRENCY_ADDRESS, quote_decimals, base_decimals)
+                                                       BASE_CURRENCY_ADDRESS, quote_decimals, base_decimals,
+                                                       pool_state=pool_state)
     else:
         logging.warning(f"DEX version {router_info['version']} or type '{router_type}' is not supported for LP price.")
         return None
@@ -277,9 +507,18 @@ def get_lp_price(pool, token_address):
 ZERO_ADDRESS = "0x" + "00" * 20
 V3_FEE_TIERS = [500, 3000, 10000, 2500, 100]
 
-def _has_code(address):
-    """Check if an address has deployed contract code."""
-    return address and address != ZERO_ADDRESS and w3.eth.get_code(address)
+# Addresses already seen with deployed code — pools don't get undeployed, so one check suffices
+_has_code_cache = set()
+
+def has_code(address):
+    """Check if an address has deployed contract code, remembering positive answers."""
+    if not address or address == ZERO_ADDRESS:
+        return False
+    if address not in _has_code_cache:
+        if not w3.eth.get_code(address):
+            return False
+        _has_code_cache.add(address)
+    return True
 
 
 def discover_pools(token_address):
@@ -301,7 +540,7 @@ def discover_pools(token_address):
 
         # Skip DEXes without a factory (aggregators like 1inch)
         if not factory_addr:
-            logging.debug(f"  - {dex_key}: no factory, skipping discovery")
+            logging.debug("  - %s: no factory, skipping discovery", dex_key)
             continue
 
         try:
@@ -320,14 +559,14 @@ def discover_pools(token_address):
 
 def _discover_v2(pools, dex_key, router_info, factory_addr, token_address, base_address, pair_label):
     """Discover V2-style pools via factory.getPair()."""
-    factory = w3.eth.contract(address=factory_addr, abi=V2_FACTORY_ABI)
+    factory = get_contract(factory_addr, 'V2_FACTORY')
     pair_addr = factory.functions.getPair(token_address, base_address).call()
 
-    if not _has_code(pair_addr):
+    if not has_code(pair_addr):
         return
 
     # Verify pool has reserves
-    pair = w3.eth.contract(address=pair_addr, abi=MINIMAL_V2_PAIR_ABI)
+    pair = get_contract(pair_addr, 'MINIMAL_V2_PAIR')
     r0, r1, _ = pair.functions.getReserves().call()
     if r0 == 0 or r1 == 0:
         logging.info(f"  - {dex_key}: pool {pair_addr} has zero reserves, skipping")
@@ -344,27 +583,41 @@ def _discover_v2(pools, dex_key, router_info, factory_addr, token_address, base_
     logging.info(f"  - {dex_key}: found V2 pool {pair_addr}")
 
 
+# Solidly pools discovered as stable, so swap preparation can route them without probing the factory
+solidly_stable_pools = set()
+
 def _discover_solidly(pools, dex_key, router_info, factory_addr, token_address, base_address, pair_label):
     """Discover Solidly-style pools (volatile + stable)."""
-    factory = w3.eth.contract(address=factory_addr, abi=SOLIDLY_FACTORY_ABI)
+    factory = get_contract(factory_addr, 'SOLIDLY_FACTORY')
 
-    for stable in [False, True]:
-        pool_addr = factory.functions.getPool(token_address, base_address, stable).call()
-        if not _has_code(pool_addr):
+    # Both pool variants in one multicall, then the reserves of those that exist in a second
+    variants = [False, True]
+    pool_addrs = multicall([factory.functions.getPool(token_address, base_address, stable) for stable in variants])
+    candidates = [(stable, addr) for stable, addr in zip(variants, pool_addrs) if addr and addr != ZERO_ADDRESS]
+    if not candidates:
+        return
+    reserves = multicall([get_contract(addr, 'SOLIDLY_PAIR').functions.getReserves() for _, addr in candidates])
+
+    for (stable, pool_addr), pool_reserves in zip(candidates, reserves):
+        # No code or a revert decodes to None; anything else proves the pool is deployed
+        if pool_reserves is None:
             continue
+        _has_code_cache.add(pool_addr)
 
         # Verify pool has reserves
-        pair = w3.eth.contract(address=pool_addr, abi=SOLIDLY_PAIR_ABI)
-        r0, r1, _ = pair.functions.getReserves().call()
+        r0, r1, _ = pool_reserves
         if r0 == 0 or r1 == 0:
             logging.info(f"  - {dex_key}: pool {pool_addr} ({'stable' if stable else 'volatile'}) has zero reserves, skipping")
             continue
 
         pool_type = "stable" if stable else "volatile"
+        if stable:
+            solidly_stable_pools.add(pool_addr)
         pools.append({
             'dex': dex_key,
             'pair': f"{pair_label} ({pool_type})",
             'pairAddress': pool_addr,
+            'stable': stable,
             'feeBps': 0,
             'liq_usd': 0,
             'base_currency_price_usd': 0,
@@ -376,27 +629,30 @@ def _discover_v3(pools, dex_key, router_info, factory_addr, token_address, base_
     """Discover V3-style pools across fee tiers."""
     router_type = router_info.get('type', 'uniswap_v3')
     if router_type == 'pancakeswap_v3':
-        factory_abi = PANCAKE_V3_FACTORY_ABI
-        pool_abi = PANCAKE_V3_POOL_ABI
+        factory_abi_key = 'PANCAKE_V3_FACTORY'
+        pool_abi_key = 'PANCAKE_V3_POOL'
     else:
-        factory_abi = UNISWAP_V3_FACTORY_ABI
-        pool_abi = UNISWAP_V3_POOL_ABI
+        factory_abi_key = 'UNISWAP_V3_FACTORY'
+        pool_abi_key = 'UNISWAP_V3_POOL'
 
-    factory = w3.eth.contract(address=factory_addr, abi=factory_abi)
+    factory = get_contract(factory_addr, factory_abi_key)
 
-    for fee in V3_FEE_TIERS:
-        pool_addr = factory.functions.getPool(token_address, base_address, fee).call()
-        if not _has_code(pool_addr):
+    # Every fee tier in one multicall, then the liquidity of the pools that exist in a second
+    pool_addrs = multicall([factory.functions.getPool(token_address, base_address, fee) for fee in V3_FEE_TIERS])
+    candidates = [(fee, addr) for fee, addr in zip(V3_FEE_TIERS, pool_addrs) if addr and addr != ZERO_ADDRESS]
+    if not candidates:
+        return
+    liquidities = multicall([get_contract(addr, pool_abi_key).functions.liquidity() for _, addr in candidates])
+
+    for (fee, pool_addr), liquidity in zip(candidates, liquidities):
+        # No code or a revert decodes to None; anything else proves the pool is deployed
+        if liquidity is None:
             continue
+        _has_code_cache.add(pool_addr)
 
         # Verify pool has liquidity
-        pool_contract = w3.eth.contract(address=pool_addr, abi=pool_abi)
-        try:
-            liquidity = pool_contract.functions.liquidity().call()
-            if liquidity == 0:
-                logging.info(f"  - {dex_key}: pool {pool_addr} at {fee} bps has zero liquidity, skipping")
-                continue
-        except Exception:
+        if liquidity == 0:
+            logging.info(f"  - {dex_key}: pool {pool_addr} at {fee} bps has zero liquidity, skipping")
             continue
 
         pools.append({
@@ -419,7 +675,7 @@ def calc_max_trade_size(pool, token_address):
     For V3: use liquidity as a rough proxy.
     Returns amount in wei, or None if cannot determine.
     """
-    router_info = find_router_info(pool['dex'], DEX_ROUTERS, pair_address=pool.get('pairAddress'))
+    router_info = get_pool_router_info(pool)
     if not router_info:
         return None
 
@@ -433,9 +689,9 @@ def calc_max_trade_size(pool, token_address):
         if router_info['version'] == 2 or router_type == 'solidly':
             # V2/Solidly: use reserves
             if router_type == 'solidly':
-                pair = w3.eth.contract(address=pool['pairAddress'], abi=SOLIDLY_PAIR_ABI)
+                pair = get_contract(pool['pairAddress'], 'SOLIDLY_PAIR')
             else:
-                pair = w3.eth.contract(address=pool['pairAddress'], abi=MINIMAL_V2_PAIR_ABI)
+                pair = get_contract(pool['pairAddress'], 'MINIMAL_V2_PAIR')
 
             r0, r1, _ = pair.functions.getReserves().call()
             token0 = w3.to_checksum_address(pair.functions.token0().call())
@@ -454,11 +710,10 @@ def calc_max_trade_size(pool, token_address):
         elif router_info['version'] == 3:
             # V3: rough heuristic — use a fraction of TVL approximated from price * liquidity
             # This is less precise than V2 but provides a reasonable cap
-            base_decimals = get_decimals(BASE_CURRENCY_ADDRESS)
             # For V3, limit to max_impact % of what slot0 + liquidity implies
             # A proper calculation would need tick math; use a conservative cap
-            return int(TRADE_AMOUNT_BASE_TOKEN * (10 ** base_decimals))  # fallback to configured amount
+            return int(TRADE_AMOUNT_BASE_TOKEN * get_token_unit(BASE_CURRENCY_ADDRESS))  # fallback to configured amount
 
     except Exception as e:
-        logging.debug(f"Could not calculate max trade size for {pool['pairAddress']}: {e}")
+        logging.debug("Could not calculate max trade size for %s: %s", pool['pairAddress'], e)
         return None
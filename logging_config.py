@@ -1,9 +1,27 @@
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Background thread that writes queued records to the file and console handlers
+_listener = None
+
+def _stop_listener():
+    """Flushes the records still queued and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(_stop_listener)
 
 def setup_logging():
-    """Sets up logging for the application."""
+    """
+    Sets up logging for the application. The bot's threads only enqueue records; file
+    rotation and console writes happen on a QueueListener thread, off the trade path.
+    """
+    global _listener
     log_directory = "logs"
     if not os.path.exists(log_directory):
         os.makedirs(log_directory)
@@ -17,17 +35,20 @@ def setup_logging():
     # Prevent adding handlers multiple times if this function is called more than once
     if logger.hasHandlers():
         logger.handlers.clear()
+    _stop_listener()
 
     # --- File Handler ---
     # Rotates logs, keeping 5 files of 5MB each.
     file_handler = RotatingFileHandler(log_file, maxBytes=5*1024*1024, backupCount=5, encoding='utf-8')
     file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
 
     # --- Console Handler ---
     console_handler = logging.StreamHandler()
     # Use a simpler format for console output, similar to print()
     console_formatter = logging.Formatter('%(message)s')
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+
+    _listener = QueueListener(queue.SimpleQueue(), file_handler, console_handler, respect_handler_level=True)
+    logger.addHandler(QueueHandler(_listener.queue))
+    _listener.start()
@@ -7,9 +7,9 @@ from config import (
     ARB_CONTRACT_ADDRESS
 )
 from abi import ERC20_ABI
-from dex_utils import (get_lp_price, check_and_approve_token, get_decimals,
-                       discover_pools, get_token_info, calc_max_trade_size)
-from trading import execute_trade_atomic, execute_trade
+from dex_utils import (get_lp_price, check_and_approve_token, get_token_unit,
+                       discover_pools, get_token_info, calc_max_trade_size, get_chain_id, MAX_UINT256)
+from trading import execute_trade_atomic, execute_trade, warm_up_signer
 from logging_config import setup_logging
 
 
@@ -64,8 +64,8 @@ class ArbitrageBot:
                 f"Buy {buy_pool['price']:.8f} / {effective_buy:.8f}. Sell {sell_pool['price']:.8f} / {effective_sell:.8f}.")
 
             # Dynamic trade sizing: use min of both pools' max safe size
-            base_decimals = get_decimals(BASE_CURRENCY_ADDRESS)
-            default_amount = int(TRADE_AMOUNT_BASE_TOKEN * (10 ** base_decimals))
+            base_unit = get_token_unit(BASE_CURRENCY_ADDRESS)
+            default_amount = int(TRADE_AMOUNT_BASE_TOKEN * base_unit)
             buy_max = calc_max_trade_size(buy_pool, token_address)
             sell_max = calc_max_trade_size(sell_pool, token_address)
             candidates = [default_amount]
@@ -76,7 +76,7 @@ class ArbitrageBot:
             trade_amount_wei = min(candidates)
 
             if trade_amount_wei < default_amount:
-                logging.info(f"  -> Dynamic sizing: {trade_amount_wei / (10**base_decimals):.6f} (capped by pool reserves)")
+                logging.info(f"  -> Dynamic sizing: {trade_amount_wei / base_unit:.6f} (capped by pool reserves)")
 
             execute_trade_atomic(buy_pool, sell_pool, spread, token_address, token_info, amount_in_wei=trade_amount_wei)
             self.last_trade_attempt_ts = time.time()
@@ -104,11 +104,12 @@ class ArbitrageBot:
             priced_pools = []
             for pool in pools:
                 try:
-                    price = get_lp_price(pool, token_address)
+                    pool_state = {}
+                    price = get_lp_price(pool, token_address, pool_state)
                     if price is not None and price > 0:
-                        priced_pools.append({**pool, 'price': price})
+                        priced_pools.append({**pool, **pool_state, 'price': price})
                 except Exception as e:
-                    logging.debug(f"Price fetch failed for {pool['dex']} {pool['pairAddress']}: {e}")
+                    logging.debug("Price fetch failed for %s %s: %s", pool['dex'], pool['pairAddress'], e)
 
             self.analyze_and_trade(priced_pools, token_address)
 
@@ -119,6 +120,8 @@ class ArbitrageBot:
 
         if account:
             logging.info(f"Bot wallet address: {account.address}")
+            # Load the signing backends now rather than on the first trade's buy leg
+            warm_up_signer(get_chain_id())
 
         # --- Phase 1: On-chain pool discovery ---
         logging.info("--- Discovering pools via on-chain factory queries ---")
@@ -138,16 +141,15 @@ class ArbitrageBot:
             logging.info("Contract manages its own approvals (run 'python deploy.py approve' if needed).")
         else:
             logging.info("--- Running Initial EOA Approval Checks (no contract configured) ---")
-            base_decimals = get_decimals(BASE_CURRENCY_ADDRESS)
-            amount_to_approve_wei = int(TRADE_AMOUNT_BASE_TOKEN * (10**base_decimals))
-            unlimited_allowance = 2**256 - 1
+            # Approve everything once with an unlimited allowance; check_and_approve_token
+            # remembers it, so per-trade approval checks never hit the RPC again.
             for dex, info in DEX_ROUTERS.items():
                 logging.info(f"\nChecking approvals for {dex.upper()} router ({info['address']})...")
-                check_and_approve_token(BASE_CURRENCY_ADDRESS, info['address'], amount_to_approve_wei)
+                check_and_approve_token(BASE_CURRENCY_ADDRESS, info['address'], MAX_UINT256)
                 for token_address in self.TOKEN_INFO:
                     token_name = self.TOKEN_INFO[token_address]['name']
                     logging.info(f"  - Approving target token: {token_name} ({token_address})")
-                    check_and_approve_token(token_address, info['address'], unlimited_allowance)
+                    check_and_approve_token(token_address, info['address'], MAX_UINT256)
                 time.sleep(1)
             logging.info("--- Initial Approval Checks Complete ---\n")
 
@@ -0,0 +1,102 @@
+import time
+import logging
+import requests
+from web3 import HTTPProvider
+from web3._utils.batching import sort_batch_response_by_response_ids
+
+# Not idempotent: a send whose response was lost may already be in the mempool, and replaying it
+# on another endpoint could broadcast it twice. These go to a single endpoint, without failover.
+NON_IDEMPOTENT_METHODS = frozenset({'eth_sendRawTransaction', 'eth_sendTransaction'})
+
+
+def _is_endpoint_failure(err):
+    """
+    True when the endpoint itself is unhealthy: connection errors, timeouts, 429 and 5xx
+    responses. Other 4xx (a malformed or oversized request, a bad API key) would fail the
+    same way on every endpoint.
+    """
+    if isinstance(err, requests.HTTPError):
+        return err.response is not None and (err.response.status_code == 429 or err.response.status_code >= 500)
+    return isinstance(err, (requests.ConnectionError, requests.Timeout))
+
+try:
+    import orjson
+except ImportError:  # optional, web3's stdlib json decoding is used without it
+    orjson = None
+
+
+class FastJsonHTTPProvider(HTTPProvider):
+    """
+    HTTPProvider that decodes responses with orjson when it is installed. Receipts and
+    JSON-RPC batch responses are the largest payloads the bot parses.
+    """
+
+    @staticmethod
+    def decode_rpc_response(raw_response):
+        if orjson is None:
+            return HTTPProvider.decode_rpc_response(raw_response)
+        return orjson.loads(raw_response)
+
+
+class RpcPoolProvider(FastJsonHTTPProvider):
+    """
+    HTTPProvider backed by several RPC endpoints. Each request goes to the healthy endpoint
+    with the lowest recent latency (exponential moving average); an endpoint failure (see
+    _is_endpoint_failure) benches that endpoint for `cooldown` seconds and a read fails over to
+    the next one. Client errors are raised as they are, and transaction sends are never
+    replayed on another endpoint.
+    Endpoints that were never measured rank first, so every endpoint gets sampled.
+    """
+
+    def __init__(self, endpoint_uris, cooldown=30.0, latency_alpha=0.2, **kwargs):
+        super().__init__(endpoint_uris[0], **kwargs)
+        self.endpoint_uris = list(endpoint_uris)
+        self.cooldown = cooldown
+        self.latency_alpha = latency_alpha
+        self.latency = {uri: 0.0 for uri in self.endpoint_uris}
+        self._benched_until = {uri: 0.0 for uri in self.endpoint_uris}
+
+    def __str__(self):
+        return f"RPC pool {', '.join(self.endpoint_uris)}"
+
+    def ranked_endpoints(self):
+        """Healthy endpoints, fastest first; every endpoint if all of them are benched."""
+        now = time.monotonic()
+        healthy = [uri for uri in self.endpoint_uris if self._benched_until[uri] <= now]
+        return sorted(healthy or self.endpoint_uris, key=self.latency.get)
+
+    def _post(self, request_data, failover=True):
+        last_error = None
+        endpoints = self.ranked_endpoints()
+        for uri in endpoints if failover else endpoints[:1]:
+            started = time.monotonic()
+            try:
+                response = self._request_session_manager.make_post_request(
+                    uri, request_data, **self.get_request_kwargs())
+            except requests.RequestException as e:
+                if not _is_endpoint_failure(e):
+                    raise
+                logging.warning(f"RPC endpoint {uri} failed ({e}), benching it for {self.cooldown:.0f}s")
+                self._benched_until[uri] = time.monotonic() + self.cooldown
+                last_error = e
+                continue
+            elapsed = time.monotonic() - started
+            previous = self.latency[uri]
+            self.latency[uri] = elapsed if not previous else \
+                previous + self.latency_alpha * (elapsed - previous)
+            self.endpoint_uri = uri
+            return response
+        raise last_error
+
+    def _make_request(self, method, request_data):
+        # Failing over to another endpoint replaces web3's same-endpoint retry loop
+        return self._post(request_data, failover=method not in NON_IDEMPOTENT_METHODS)
+
+    def make_batch_request(self, batch_requests):
+        request_data = self.encode_batch_rpc_request(batch_requests)
+        failover = not any(method in NON_IDEMPOTENT_METHODS for method, _ in batch_requests)
+        response = self.decode_rpc_response(self._post(request_data, failover=failover))
+        if not isinstance(response, list):
+            # RPC errors return only one response with the error object
+            return response
+        return sort_batch_response_by_response_ids(response)
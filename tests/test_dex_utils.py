@@ -24,3 +24,199 @@ def test_find_router_info_returns_none_when_missing():
     routers = {'uniswap_v2': {'address': '0x2', 'version': 2}}
     assert find_router_info('pancakeswap', routers) is None
 
+
+
+def test_get_v2_amount_out_matches_uniswap_formula():
+    from dex_utils import get_v2_amount_out
+    # UniswapV2Library: 1000 * 997 * 2_000_000 // (1_000_000 * 1000 + 1000 * 997)
+    assert get_v2_amount_out(1000, 1_000_000, 2_000_000) == 1992
+    assert get_v2_amount_out(0, 1_000, 1_000) == 0
+
+
+def test_get_v3_spot_amount_out_both_directions():
+    from dex_utils import get_v3_spot_amount_out
+    sqrt_price_x96 = 2 * 2**96  # price token1/token0 = 4
+    assert get_v3_spot_amount_out(1000, sqrt_price_x96, zero_for_one=True) == 4000
+    assert get_v3_spot_amount_out(4000, sqrt_price_x96, zero_for_one=False) == 1000
+    # 1 % fee tier is taken from the input
+    assert get_v3_spot_amount_out(1000, sqrt_price_x96, zero_for_one=True, fee=10000) == 3960
+
+
+def test_get_contract_reuses_instance():
+    from dex_utils import get_contract
+    addr = '0x4200000000000000000000000000000000000006'
+    erc20 = get_contract(addr, 'ERC20')
+    assert get_contract(addr, 'ERC20') is erc20
+    assert get_contract(addr, 'MINIMAL_V2_PAIR') is not erc20
+
+
+def test_multicall_decodes_results_and_failures(monkeypatch):
+    import dex_utils
+    from eth_abi import encode
+
+    token = dex_utils.get_contract('0x4200000000000000000000000000000000000006', 'ERC20')
+    captured = {}
+
+    class FakeAggregate:
+        def __init__(self, calls):
+            captured['calls'] = calls
+
+        def call(self, block_identifier='latest'):
+            return [(True, encode(['uint256'], [123])), (False, b'')]
+
+    class FakeAggregator:
+        class functions:
+            aggregate3 = FakeAggregate
+
+    monkeypatch.setattr(dex_utils, 'get_contract', lambda address, abi_key: FakeAggregator)
+    owner = '0x0000000000000000000000000000000000000001'
+    calls = [token.functions.balanceOf(owner), token.functions.decimals()]
+
+    assert dex_utils.multicall(calls) == [123, None]
+    assert [c[0] for c in captured['calls']] == [token.address, token.address]
+    assert all(c[1] for c in captured['calls'])
+
+
+def test_discover_v3_reads_tiers_and_liquidity_in_two_multicalls(monkeypatch):
+    import dex_utils
+
+    zero = dex_utils.ZERO_ADDRESS
+    dead_pool = '0x1000000000000000000000000000000000000001'
+    live_pool = '0x2000000000000000000000000000000000000002'
+    responses = iter([
+        [live_pool, zero, dead_pool, zero, zero],  # getPool per V3_FEE_TIERS
+        [10**18, None],                            # liquidity per candidate
+    ])
+    batches = []
+
+    def fake_multicall(calls):
+        batches.append(len(calls))
+        return next(responses)
+
+    monkeypatch.setattr(dex_utils, 'multicall', fake_multicall)
+    pools = []
+    dex_utils._discover_v3(pools, 'uniswap_v3', {'version': 3}, '0x33128a8fC17869897dcE68Ed026d694621f6FDfD',
+                           '0x4200000000000000000000000000000000000006',
+                           '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913', 'WETH/USDC')
+
+    assert batches == [5, 2]
+    assert [(p['pairAddress'], p['feeBps']) for p in pools] == [(live_pool, dex_utils.V3_FEE_TIERS[0])]
+
+
+def test_v2_pool_price_from_raw_reads(monkeypatch):
+    import dex_utils
+    from eth_abi import encode
+
+    token = '0x4200000000000000000000000000000000000006'
+    base = '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913'
+    returns = {
+        dex_utils.GET_RESERVES_SELECTOR: encode(['uint112', 'uint112', 'uint32'], [4 * 10**6, 2 * 10**18, 1]),
+        dex_utils.TOKEN0_SELECTOR: encode(['address'], [base]),
+    }
+    monkeypatch.setattr(dex_utils, '_raw_call', lambda address, selector: returns[selector])
+    monkeypatch.setattr(dex_utils, '_token0_cache', {})
+
+    pool_state = {}
+    # token is token1 here: 2 tokens (18 dec) against 4 base (6 dec) -> 2 base per token
+    price = dex_utils._get_v2_pool_price('0x1000000000000000000000000000000000000001', token, base, 18, 6,
+                                         pool_state=pool_state)
+    assert price == 2.0
+    assert pool_state == {'reserve_in': 2 * 10**18, 'reserve_out': 4 * 10**6}
+
+
+def test_v3_pool_price_reads_pool_state_in_one_call(monkeypatch):
+    import dex_utils
+    from eth_abi import encode, decode
+
+    pool = '0x3000000000000000000000000000000000000003'
+    token = '0x4200000000000000000000000000000000000006'
+    base = '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913'
+    returns = {
+        dex_utils.SLOT0_SELECTOR: encode(['uint160', 'int24'], [2**96, 0]),
+        dex_utils.TOKEN0_SELECTOR: encode(['address'], [token]),
+        dex_utils.LIQUIDITY_SELECTOR: encode(['uint128'], [7 * 10**15]),
+    }
+    reads = []
+
+    def fake_raw_call(address, data):
+        if address == pool:
+            reads.append([data])
+            return returns[data]
+        # Multicall3.aggregate3 of calls to the pool, none allowed to fail
+        assert address == dex_utils.MULTICALL3_ADDRESS and data[:4] == dex_utils.AGGREGATE3_SELECTOR
+        calls = decode(['(address,bool,bytes)[]'], data[4:])[0]
+        assert all(target.lower() == pool.lower() and not allow_failure for target, allow_failure, _ in calls)
+        reads.append([selector for _, _, selector in calls])
+        return encode(['(bool,bytes)[]'], [[(True, returns[selector]) for _, _, selector in calls]])
+
+    monkeypatch.setattr(dex_utils, '_raw_call', fake_raw_call)
+    monkeypatch.setattr(dex_utils, '_token0_cache', {})
+    monkeypatch.setattr(dex_utils.time, 'time', lambda: 1_700_000_000.0)
+
+    pool_state = {}
+    price = dex_utils._get_uniswap_or_pancakeswap_pool_price(pool, 'uniswap_v3', token, base, 18, 18,
+                                                             pool_state=pool_state)
+    assert price == 1.0
+    assert pool_state == {'sqrtPriceX96': 2**96, 'token_is_token0': True, 'liquidity': 7 * 10**15,
+                          'scanned_at': 1_700_000_000.0}
+
+    # token0 is cached after the first poll; without pool_state only slot0 is read
+    dex_utils._get_uniswap_or_pancakeswap_pool_price(pool, 'uniswap_v3', token, base, 18, 18, pool_state={})
+    dex_utils._get_uniswap_or_pancakeswap_pool_price(pool, 'uniswap_v3', token, base, 18, 18)
+    assert reads == [
+        [dex_utils.SLOT0_SELECTOR, dex_utils.TOKEN0_SELECTOR, dex_utils.LIQUIDITY_SELECTOR],
+        [dex_utils.SLOT0_SELECTOR, dex_utils.LIQUIDITY_SELECTOR],
+        [dex_utils.SLOT0_SELECTOR],
+    ]
+
+
+def test_get_token_info_reads_once(monkeypatch):
+    import dex_utils
+    batches = []
+
+    def fake_multicall(calls):
+        batches.append(len(calls))
+        return ['WETH', 'Wrapped Ether']
+
+    monkeypatch.setattr(dex_utils, 'multicall', fake_multicall)
+    monkeypatch.setattr(dex_utils, '_token_info_cache', {})
+    addr = '0x4200000000000000000000000000000000000006'
+
+    assert dex_utils.get_token_info(addr) == {'symbol': 'WETH', 'name': 'Wrapped Ether'}
+    assert dex_utils.get_token_info(addr) == {'symbol': 'WETH', 'name': 'Wrapped Ether'}
+    assert batches == [2]
+
+
+def test_get_pool_router_info_caches_resolution(monkeypatch):
+    import dex_utils
+    lookups = []
+    router = {'address': '0x2', 'version': 2}
+
+    def fake_find(dex_id, routers, pair_address=None):
+        lookups.append((dex_id, pair_address))
+        return router
+
+    monkeypatch.setattr(dex_utils, 'find_router_info', fake_find)
+    monkeypatch.setattr(dex_utils, '_pool_router_cache', {})
+    pool = {'dex': 'baseswap', 'pairAddress': '0xpair'}
+
+    assert dex_utils.get_pool_router_info(pool) is router
+    assert dex_utils.get_pool_router_info(dict(pool)) is router
+    assert lookups == [('baseswap', '0xpair')]
+
+
+def test_token_metadata_persists_across_restarts(monkeypatch, tmp_path):
+    import pytest
+    import dex_utils
+    addr = '0x4200000000000000000000000000000000000006'
+    monkeypatch.setattr(dex_utils, 'TOKEN_CACHE_PATH', str(tmp_path / 'tokens.json'))
+    monkeypatch.setattr(dex_utils, 'multicall', lambda calls: ['WETH', 'Wrapped Ether'])
+    monkeypatch.setattr(dex_utils, '_token_disk_cache', None)
+    monkeypatch.setattr(dex_utils, '_token_info_cache', {})
+    dex_utils.get_token_info(addr)
+
+    # a fresh process: empty in-memory caches, no RPC available
+    monkeypatch.setattr(dex_utils, 'multicall', lambda calls: pytest.fail("metadata should come from disk"))
+    monkeypatch.setattr(dex_utils, '_token_disk_cache', None)
+    monkeypatch.setattr(dex_utils, '_token_info_cache', {})
+    assert dex_utils.get_token_info(addr) == {'symbol': 'WETH', 'name': 'Wrapped Ether'}
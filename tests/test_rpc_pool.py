@@ -0,0 +1,90 @@
+import pytest
+import requests
+
+from rpc_pool import RpcPoolProvider
+
+FAST = "http://fast.example"
+SLOW = "http://slow.example"
+DOWN = "http://down.example"
+
+
+def test_pool_prefers_fastest_endpoint_and_benches_failures(monkeypatch):
+    provider = RpcPoolProvider([DOWN, SLOW, FAST])
+    provider.latency.update({DOWN: 0.01, SLOW: 0.5, FAST: 0.1})
+    posted = []
+
+    def fake_post(uri, data, **kwargs):
+        posted.append(uri)
+        if uri == DOWN:
+            raise requests.ConnectionError("connection refused")
+        return b'{"jsonrpc": "2.0", "id": 0, "result": "0x2105"}'
+
+    monkeypatch.setattr(provider._request_session_manager, 'make_post_request', fake_post)
+
+    assert provider.make_request('eth_chainId', [])['result'] == '0x2105'
+    assert posted == [DOWN, FAST]
+    assert provider.ranked_endpoints() == [FAST, SLOW]
+
+    provider.make_request('eth_chainId', [])
+    assert posted[-1] == FAST
+
+
+def test_pool_never_replays_sends_on_another_endpoint(monkeypatch):
+    provider = RpcPoolProvider([DOWN, FAST])
+    provider.latency.update({DOWN: 0.01, FAST: 0.1})
+    posted = []
+
+    def fake_post(uri, data, **kwargs):
+        posted.append(uri)
+        if uri == DOWN:
+            raise requests.ReadTimeout("read timed out")
+        return b'[{"jsonrpc": "2.0", "id": 0, "result": "0x01"}]'
+
+    monkeypatch.setattr(provider._request_session_manager, 'make_post_request', fake_post)
+
+    # The timed-out send may already be in the mempool: it is raised, not re-sent to FAST
+    with pytest.raises(requests.ReadTimeout):
+        provider.make_request('eth_sendRawTransaction', ['0x01'])
+    assert posted == [DOWN]
+
+    # With every endpoint benched DOWN ranks first again; a batch holding a send is not replayed either
+    provider._benched_until[FAST] = float('inf')
+    with pytest.raises(requests.ReadTimeout):
+        provider.make_batch_request([('eth_sendRawTransaction', ['0x01']), ('eth_sendRawTransaction', ['0x02'])])
+    assert posted == [DOWN, DOWN]
+
+
+def test_pool_raises_client_errors_without_benching(monkeypatch):
+    provider = RpcPoolProvider([FAST, SLOW])
+    provider.latency.update({FAST: 0.1, SLOW: 0.5})
+    posted = []
+    status = {'code': 400}
+
+    def fake_post(uri, data, **kwargs):
+        posted.append(uri)
+        response = requests.Response()
+        response.status_code = status['code']
+        raise requests.HTTPError(f"{status['code']} error", response=response)
+
+    monkeypatch.setattr(provider._request_session_manager, 'make_post_request', fake_post)
+
+    # A rejected request (here an oversized batch) would fail the same way everywhere
+    with pytest.raises(requests.HTTPError):
+        provider.make_batch_request([('eth_chainId', [])] * 3)
+    assert posted == [FAST]
+    assert provider.ranked_endpoints() == [FAST, SLOW]
+
+    # A rate limit is the endpoint's problem: bench it and fail over
+    status['code'] = 429
+    with pytest.raises(requests.HTTPError):
+        provider.make_request('eth_chainId', [])
+    assert posted == [FAST, FAST, SLOW]
+
+
+def test_fast_json_decoding_matches_web3():
+    from web3 import HTTPProvider
+    from rpc_pool import FastJsonHTTPProvider
+
+    raw = b'[{"jsonrpc": "2.0", "id": 1, "result": {"logs": [], "status": "0x1"}}, ' \
+          b'{"jsonrpc": "2.0", "id": 2, "error": {"code": -32000, "message": "nonce too low"}}]'
+    assert FastJsonHTTPProvider.decode_rpc_response(raw) == HTTPProvider.decode_rpc_response(raw)
@@ -0,0 +1,708 @@
+import os
+# Ensure minimal env vars for config import
+os.environ.setdefault('BASE_RPC_URL', 'ws://localhost:8545')
+
+import pytest
+import requests
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.providers.base import JSONBaseProvider
+
+from abi import UNISWAP_V3_ROUTER_ABI, PANCAKE_V3_ROUTER_ABI
+from config import MULTICALL3_ADDRESS
+from trading import (V3_EXACT_INPUT_SINGLE_PARAMS, V3_EXACT_INPUT_SINGLE_SELECTOR,
+                     PANCAKE_V3_EXACT_INPUT_SINGLE_SELECTOR, EncodedCall)
+
+ROUTER = "0x2626664c2603336E57B271c5C0b26F421741e481"
+TOKEN_IN = "0x4200000000000000000000000000000000000006"
+TOKEN_OUT = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+RECIPIENT = "0x000000000000000000000000000000000000dEaD"
+
+
+class FakeSigned:
+    """Signed transaction stand-in: the raw bytes are just the nonce."""
+
+    def __init__(self, txn):
+        self.raw_transaction = HexBytes(bytes([txn['nonce']]))
+        self.hash = Web3.keccak(self.raw_transaction)
+
+
+class FakeAccount:
+    address = RECIPIENT
+
+    def sign_transaction(self, txn):
+        return FakeSigned(txn)
+
+
+class RecordingProvider(JSONBaseProvider):
+    """
+    Answers JSON-RPC requests with responder(method, params), either a result or a
+    {'error': ...} dict, and records every request and batch it is sent.
+    """
+
+    def __init__(self, responder, batching=True):
+        super().__init__()
+        self.responder = responder
+        self.batching = batching
+        self.requests = []
+        self.batches = []
+
+    def _respond(self, request_id, method, params):
+        answer = self.responder(method, list(params))
+        if isinstance(answer, dict) and 'error' in answer:
+            return {'jsonrpc': '2.0', 'id': request_id, **answer}
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': answer}
+
+    def make_request(self, method, params):
+        self.requests.append((method, list(params)))
+        return self._respond(0, method, params)
+
+    def make_batch_request(self, requests):
+        if not self.batching:
+            raise ValueError("batch requests not supported")
+        self.batches.append([(method, list(params)) for method, params in requests])
+        return [self._respond(i, method, params) for i, (method, params) in enumerate(requests)]
+
+
+@pytest.fixture
+def fake_account(monkeypatch):
+    import trading
+    account = FakeAccount()
+    monkeypatch.setattr(trading, 'account', account)
+    return account
+
+
+@pytest.fixture
+def rpc(monkeypatch):
+    """
+    install(responder, write=False, batching=True) routes trading's read Web3 (or the write
+    one) through a RecordingProvider and returns the provider.
+    """
+    import dex_utils
+    import trading
+
+    def install(responder, write=False, batching=True):
+        provider = RecordingProvider(responder, batching)
+        if write:
+            monkeypatch.setattr(trading, 'w3_write', Web3(provider))
+        else:
+            web3 = Web3(provider)
+            monkeypatch.setattr(trading, 'w3', web3)
+            # Contracts are built against dex_utils.w3 and cached
+            monkeypatch.setattr(dex_utils, 'w3', web3)
+            dex_utils.get_contract.cache_clear()
+        return provider
+
+    yield install
+    dex_utils.get_contract.cache_clear()
+
+
+def test_v3_exact_input_single_calldata_matches_web3_encoding():
+    params = (TOKEN_IN, TOKEN_OUT, 500, RECIPIENT, 10**15, 123, 0)
+    router = Web3().eth.contract(address=ROUTER, abi=UNISWAP_V3_ROUTER_ABI)
+    expected = router.encode_abi('exactInputSingle', args=[params])
+    calldata = V3_EXACT_INPUT_SINGLE_SELECTOR + encode([V3_EXACT_INPUT_SINGLE_PARAMS], [params])
+    assert Web3.to_hex(calldata) == expected
+
+
+def test_pancake_v3_exact_input_single_calldata_matches_web3_encoding():
+    params = (TOKEN_IN, TOKEN_OUT, 2500, RECIPIENT, 10**15, 0, 0)
+    router = Web3().eth.contract(address=ROUTER, abi=PANCAKE_V3_ROUTER_ABI)
+    expected = router.encode_abi('exactInputSingle', args=[params, 1_700_000_000])
+    calldata = PANCAKE_V3_EXACT_INPUT_SINGLE_SELECTOR + encode(
+        [V3_EXACT_INPUT_SINGLE_PARAMS, 'uint256'], [params, 1_700_000_000])
+    assert Web3.to_hex(calldata) == expected
+
+
+def test_encoded_call_build_transaction_sets_target_and_data():
+    tx = EncodedCall(ROUTER, b'\x01\x02').build_transaction({'nonce': 7, 'gas': 21000})
+    assert tx == {'nonce': 7, 'gas': 21000, 'to': ROUTER, 'data': b'\x01\x02', 'value': 0}
+
+
+def test_get_swap_builder_resolves_type_before_version_default():
+    from trading import (_get_swap_builder, _build_1inch_swap, _build_alien_base_swap,
+                         _build_solidly_swap, _build_uniswap_v2_swap, _build_uniswap_v3_swap)
+    assert _get_swap_builder('1inch', 6) is _build_1inch_swap
+    assert _get_swap_builder('alienbase', 2) is _build_alien_base_swap
+    assert _get_swap_builder('solidly', 2) is _build_solidly_swap
+    assert _get_swap_builder('uniswap_v2', 2) is _build_uniswap_v2_swap
+    # V3 forks typed as solidly (e.g. Equalizer V3) still route through the V3 builder
+    assert _get_swap_builder('solidly', 3) is _build_uniswap_v3_swap
+    assert _get_swap_builder('maverick_v1', 1) is None
+
+
+def test_min_amount_out_uses_integer_slippage():
+    from trading import _calc_min_amount_out, _calc_min_amount_out_sell, SLIPPAGE_NUMERATOR, SLIPPAGE_DENOMINATOR
+    # 1 WETH buys 2 tokens at 0.5 WETH/token (18 -> 6 decimals)
+    expected_buy = 2 * 10**6
+    assert _calc_min_amount_out(10**18, 0.5, 10**18, 10**6) == expected_buy * SLIPPAGE_NUMERATOR // SLIPPAGE_DENOMINATOR
+    # selling those tokens back at the same price returns 1 WETH before slippage
+    assert _calc_min_amount_out_sell(expected_buy, 0.5, 10**6, 10**18) == 10**18 * SLIPPAGE_NUMERATOR // SLIPPAGE_DENOMINATOR
+
+
+def test_quote_off_chain_prefers_cached_pool_state():
+    from trading import _quote_off_chain
+    v2_pool = {'reserve_in': 2_000_000, 'reserve_out': 1_000_000}
+    # UniswapV2's 997/1000 unless the router configures its own fee
+    assert _quote_off_chain(v2_pool, 100_000, selling=True) == 47482
+    assert _quote_off_chain(v2_pool, 100_000, selling=True, router_info={'version': 2, 'feeBps': 20}) == 47528
+    v3_pool = {'sqrtPriceX96': 2 * 2**96, 'token_is_token0': True, 'feeBps': 0}
+    assert _quote_off_chain(v3_pool, 1000, selling=True) == 4000
+    assert _quote_off_chain(v3_pool, 4000, selling=False) == 1000
+    assert _quote_off_chain({'price': 1.0}, 1000, selling=True) is None
+
+
+LATEST_BLOCK = {'number': '0x10', 'hash': '0x' + '11' * 32, 'baseFeePerGas': hex(10**9)}
+
+
+def _preflight_responder(method, params):
+    if method == 'eth_call':
+        # aggregate3 result: one successful call returning 7
+        return Web3.to_hex(encode(['(bool,bytes)[]'], [[(True, encode(['uint256'], [7]))]]))
+    return {'eth_getBlockByNumber': LATEST_BLOCK, 'eth_maxPriorityFeePerGas': '0x5',
+            'eth_getTransactionCount': '0x2a', 'eth_chainId': '0x2105'}[method]
+
+
+def test_preflight_reads_sends_one_batch(rpc, fake_account):
+    import trading
+    provider = rpc(_preflight_responder)
+    token = trading.get_contract(TOKEN_IN, 'ERC20')
+
+    results, base_fee, max_priority_fee, nonce = trading._preflight_reads([token.functions.decimals()])
+
+    assert (results, base_fee, max_priority_fee, nonce) == ([7], 10**9, 5, 42)
+    assert provider.requests == []
+    [batch] = provider.batches
+    assert [method for method, _ in batch] == \
+        ['eth_call', 'eth_getBlockByNumber', 'eth_maxPriorityFeePerGas', 'eth_getTransactionCount']
+    call, block = batch[0][1]
+    assert call['to'] == MULTICALL3_ADDRESS and block == 'latest'
+    assert batch[1][1] == ['latest', False]
+    assert batch[3][1] == [RECIPIENT, 'latest']
+
+
+def test_preflight_base_fee_comes_from_the_block_header(rpc, fake_account):
+    import trading
+    def responder(method, params):
+        # eth_call runs without a gas price, so BASEFEE inside the call reads 0
+        if method == 'eth_call':
+            return Web3.to_hex(encode(['(bool,bytes)[]'], [[(True, encode(['uint256'], [0]))]]))
+        return _preflight_responder(method, params)
+
+    provider = rpc(responder)
+    aggregator = trading.get_contract(MULTICALL3_ADDRESS, 'MULTICALL3')
+
+    (call_base_fee,), base_fee, _, _ = trading._preflight_reads([aggregator.functions.getBasefee()])
+    assert call_base_fee == 0
+    assert base_fee == 10**9
+
+    # without multicall reads only the header, tip and nonce are requested
+    results, base_fee, _, _ = trading._preflight_reads([])
+    assert (results, base_fee) == ([], 10**9)
+    assert [method for method, _ in provider.batches[-1]] == \
+        ['eth_getBlockByNumber', 'eth_maxPriorityFeePerGas', 'eth_getTransactionCount']
+
+
+def test_preflight_reads_falls_back_to_serial_calls(rpc, fake_account):
+    import trading
+    provider = rpc(_preflight_responder, batching=False)
+    token = trading.get_contract(TOKEN_IN, 'ERC20')
+
+    results, base_fee, max_priority_fee, nonce = trading._preflight_reads([token.functions.decimals()])
+
+    assert (results, base_fee, max_priority_fee, nonce) == ([7], 10**9, 5, 42)
+    # web3's validation middleware may ask for the chain id before an eth_call
+    assert [method for method, _ in provider.requests if method != 'eth_chainId'] == \
+        ['eth_call', 'eth_getBlockByNumber', 'eth_maxPriorityFeePerGas', 'eth_getTransactionCount']
+
+
+def test_v3_pool_search_picks_first_live_pool_from_multicall(monkeypatch, fake_account):
+    import trading
+
+    zero = "0x" + "00" * 20
+    empty_pool = "0x1000000000000000000000000000000000000001"
+    live_pool = "0x2000000000000000000000000000000000000002"
+    # Fee tiers are probed as [500, 3000, 10000, 2500, 100]
+    responses = iter([
+        [zero, empty_pool, live_pool, zero, zero],        # factory.getPool per tier
+        [(2**96, 0), 0, (2**96, 0), 10**18],              # slot0/liquidity per candidate
+    ])
+    batches = []
+
+    def fake_multicall(calls):
+        batches.append(len(calls))
+        return next(responses)
+
+    monkeypatch.setattr(trading, 'multicall', fake_multicall)
+    router_info = {'address': ROUTER, 'version': 3, 'type': 'uniswap_v3',
+                   'factory': "0x33128a8fC17869897dcE68Ed026d694621f6FDfD"}
+
+    swap_fn, _ = trading._prepare_uniswap_v3_swap('uniswap_v3', router_info, 10**15, TOKEN_IN, TOKEN_OUT)
+
+    assert batches == [5, 4]
+    expected = (TOKEN_IN, TOKEN_OUT, 10000, RECIPIENT, 10**15, 0, 0)
+    assert swap_fn.data == V3_EXACT_INPUT_SINGLE_SELECTOR + encode([V3_EXACT_INPUT_SINGLE_PARAMS], [expected])
+
+
+def test_resilient_rpc_call_retries_with_jittered_backoff(monkeypatch):
+    import trading
+    sleeps = []
+    monkeypatch.setattr(trading.time, 'sleep', sleeps.append)
+    attempts = iter([TimeoutError(), ConnectionError(), 99])
+
+    def flaky():
+        result = next(attempts)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert trading.resilient_rpc_call(flaky) == 99
+    assert len(sleeps) == 2
+    assert all(trading.RPC_BACKOFF_BASE <= s <= trading.RPC_BACKOFF_MAX for s in sleeps)
+
+
+def test_resilient_rpc_call_does_not_retry_reverts(monkeypatch):
+    import pytest
+    import trading
+    from web3.exceptions import ContractLogicError
+    monkeypatch.setattr(trading.time, 'sleep', lambda s: pytest.fail("reverts must not be retried"))
+
+    def revert():
+        raise ContractLogicError("execution reverted")
+
+    with pytest.raises(ContractLogicError):
+        trading.resilient_rpc_call(revert)
+
+
+def test_parse_receipt_sums_transfers_to_account(monkeypatch):
+    import trading
+    from hexbytes import HexBytes
+
+    me = HexBytes(bytes(12) + bytes.fromhex(RECIPIENT[2:]))
+    pool = HexBytes(bytes(12) + bytes.fromhex(ROUTER[2:]))
+    monkeypatch.setattr(trading, 'ACCOUNT_TOPIC', me)
+
+    def transfer(token, sender, receiver, amount):
+        return {'address': token, 'topics': [trading.TRANSFER_EVENT_TOPIC, sender, receiver],
+                'data': HexBytes(encode(['uint256'], [amount]))}
+
+    receipt = {'logs': [
+        transfer(TOKEN_IN, me, pool, 10**18),     # our payment into the pool
+        transfer(TOKEN_OUT, pool, me, 2500),      # proceeds
+        transfer(TOKEN_OUT, pool, pool, 777),     # unrelated hop
+    ]}
+    router_info = {'address': ROUTER, 'version': 3}
+    assert trading._parse_receipt_for_amount_out(receipt, router_info, 'uniswap_v3', TOKEN_OUT, 6) == 2500
+    assert trading._parse_receipt_for_amount_out(receipt, router_info, 'uniswap_v3', ROUTER, 18) == 0
+
+
+def test_encode_swap_data_uses_discovered_solidly_stability():
+    from eth_abi import decode
+    from trading import _encode_swap_data, DEX_SOLIDLY
+    router_info = {'address': ROUTER, 'version': 2, 'type': 'solidly', 'factory': RECIPIENT}
+    stable_data = _encode_swap_data(DEX_SOLIDLY, router_info, {'stable': True}, 5)
+    volatile_data = _encode_swap_data(DEX_SOLIDLY, router_info, {}, 5)
+    assert decode(['bool', 'address', 'uint256'], stable_data)[0] is True
+    assert decode(['bool', 'address', 'uint256'], volatile_data)[0] is False
+
+
+def test_wait_for_receipt_backs_off_until_mined(monkeypatch):
+    import trading
+    from web3.exceptions import TransactionNotFound
+
+    sleeps = []
+    monkeypatch.setattr(trading.time, 'sleep', sleeps.append)
+    dropped = requests.ConnectionError("connection reset")
+    polls = iter([None, None, dropped, None, {'status': 1}])
+
+    class FakeEth:
+        def get_transaction_receipt(self, tx_hash):
+            receipt = next(polls)
+            if receipt is None:
+                raise TransactionNotFound("not yet")
+            if receipt is dropped:
+                raise receipt   # transient: polled again on the next tick
+            return receipt
+
+    class FakeW3:
+        eth = FakeEth()
+
+    monkeypatch.setattr(trading, 'w3', FakeW3())
+    assert trading._wait_for_receipt(b'\x01') == {'status': 1}
+    assert sleeps == [trading.RECEIPT_POLL_INITIAL_DELAY, 0.25, 0.5, 1.0, 2.0]
+
+
+def test_reads_keep_a_transport_retry_but_sends_do_not():
+    import config
+    retry = config._read_retry_configuration()
+
+    assert 'eth_getTransactionReceipt' in retry.method_allowlist and 'eth_call' in retry.method_allowlist
+    assert 'eth_sendRawTransaction' not in retry.method_allowlist
+    assert retry.retries == config.RPC_TRANSPORT_RETRIES + 1
+    # HTTP error statuses are left to resilient_rpc_call, which tells 429/5xx from other 4xx
+    assert requests.Timeout in retry.errors and requests.HTTPError not in retry.errors
+
+
+def _mined_receipt(tx_hash):
+    return {'transactionHash': tx_hash, 'blockHash': '0x' + '22' * 32, 'blockNumber': '0x5',
+            'transactionIndex': '0x0', 'from': RECIPIENT, 'to': ROUTER, 'status': '0x1',
+            'gasUsed': '0x30d40', 'cumulativeGasUsed': '0x30d40', 'effectiveGasPrice': '0x3b9aca00',
+            'logs': [], 'logsBloom': '0x' + '00' * 256, 'contractAddress': None, 'type': '0x2'}
+
+
+def test_wait_for_receipts_batches_legs_in_flight_together(monkeypatch, rpc):
+    import trading
+
+    buy, sell = '0x' + 'aa' * 32, '0x' + 'bb' * 32
+    mined_after = {buy: 2, sell: 3}   # polls before each receipt appears
+    polls = []
+
+    def responder(method, params):
+        assert method == 'eth_getTransactionReceipt'
+        polls.append(params[0])
+        return _mined_receipt(params[0]) if polls.count(params[0]) > mined_after[params[0]] else None
+
+    sleeps = []
+    monkeypatch.setattr(trading.time, 'sleep', sleeps.append)
+    provider = rpc(responder)
+
+    buy_receipt, sell_receipt = trading._wait_for_receipts([HexBytes(buy), HexBytes(sell)])
+
+    assert (buy_receipt['transactionHash'], sell_receipt['transactionHash']) == (HexBytes(buy), HexBytes(sell))
+    assert (sell_receipt['status'], sell_receipt['gasUsed']) == (1, 200_000)
+    # one shared schedule: both legs in one batch per round, then the sell alone once the buy is mined
+    assert sleeps == [trading.RECEIPT_POLL_INITIAL_DELAY, 0.25, 0.5, 1.0]
+    assert provider.batches == [[('eth_getTransactionReceipt', [buy]), ('eth_getTransactionReceipt', [sell])]] * 3
+    assert provider.requests == [('eth_getTransactionReceipt', [sell])]
+
+
+def test_v3_preparation_reuses_recently_validated_pool(monkeypatch, fake_account):
+    import trading
+
+    pool = "0x3000000000000000000000000000000000000003"
+    calls = []
+
+    def fake_multicall(batch):
+        calls.append(len(batch))
+        return [3000, (2**96, 0), 10**18]   # fee, slot0, liquidity of the provided pool
+
+    monkeypatch.setattr(trading, 'multicall', fake_multicall)
+    monkeypatch.setattr(trading, '_validated_v3_pools', {})
+    router_info = {'address': ROUTER, 'version': 3, 'type': 'uniswap_v3',
+                   'factory': "0x33128a8fC17869897dcE68Ed026d694621f6FDfD"}
+
+    # speculative build with the expected amount, then the real one with the received amount
+    trading._prepare_uniswap_v3_swap('uniswap_v3', router_info, 10**15, TOKEN_OUT, TOKEN_IN, pair_address=pool)
+    swap_fn, _ = trading._prepare_uniswap_v3_swap('uniswap_v3', router_info, 999, TOKEN_OUT, TOKEN_IN,
+                                                  pair_address=pool, min_amount_out_wei=5)
+
+    assert calls == [3]
+    expected = (TOKEN_OUT, TOKEN_IN, 3000, RECIPIENT, 999, 5, 0)
+    assert swap_fn.data == V3_EXACT_INPUT_SINGLE_SELECTOR + encode([V3_EXACT_INPUT_SINGLE_PARAMS], [expected])
+
+
+def test_v3_preparation_trusts_scanned_pool_state(monkeypatch, fake_account):
+    import trading
+
+    pool_address = "0x3000000000000000000000000000000000000003"
+
+    def fake_multicall(batch):
+        raise AssertionError("scanned pool should not be re-read")
+
+    monkeypatch.setattr(trading, 'multicall', fake_multicall)
+    monkeypatch.setattr(trading, '_validated_v3_pools', {})
+    router_info = {'address': ROUTER, 'version': 3, 'type': 'uniswap_v3',
+                   'factory': "0x33128a8fC17869897dcE68Ed026d694621f6FDfD"}
+    pool = {'pairAddress': pool_address, 'feeBps': 500, 'sqrtPriceX96': 2**96, 'liquidity': 10**18,
+            'scanned_at': trading.time.time()}
+
+    trading._trust_scanned_v3_pool(router_info, pool, TOKEN_OUT, TOKEN_IN)
+    swap_fn, _ = trading._prepare_uniswap_v3_swap('uniswap_v3', router_info, 999, TOKEN_OUT, TOKEN_IN,
+                                                  pair_address=pool_address, fee_bps_hint=500)
+
+    expected = (TOKEN_OUT, TOKEN_IN, 500, RECIPIENT, 999, 0, 0)
+    assert swap_fn.data == V3_EXACT_INPUT_SINGLE_SELECTOR + encode([V3_EXACT_INPUT_SINGLE_PARAMS], [expected])
+
+    # Without a scanned price, with drained liquidity or from a stale scan there is nothing to trust
+    stale = trading.time.time() - trading.V3_POOL_VALIDATION_TTL
+    for untrusted in ({**pool, 'sqrtPriceX96': 0}, {**pool, 'liquidity': 0}, {**pool, 'scanned_at': stale},
+                      {k: v for k, v in pool.items() if k != 'scanned_at'}):
+        trading._validated_v3_pools.clear()
+        trading._trust_scanned_v3_pool(router_info, untrusted, TOKEN_OUT, TOKEN_IN)
+        assert trading._validated_v3_pools == {}
+
+
+def test_build_swap_tx_matches_web3_build_transaction(fake_account):
+    import trading
+
+    router = Web3().eth.contract(address=ROUTER, abi=UNISWAP_V3_ROUTER_ABI)
+    swap_fn = router.functions.exactInputSingle((TOKEN_IN, TOKEN_OUT, 500, RECIPIENT, 10**15, 123, 0))
+    payload = {'from': RECIPIENT, 'nonce': 3, 'gas': 300000, 'maxFeePerGas': 20,
+               'maxPriorityFeePerGas': 2, 'chainId': 8453}
+
+    tx = trading._build_swap_tx(swap_fn, 3, 20, 2, 8453, gas=300000)
+    assert tx == {**swap_fn.build_transaction(payload), 'type': 2}
+
+    encoded = EncodedCall(ROUTER, b'\x01\x02')
+    assert trading._build_swap_tx(encoded, 3, 20, 2, 8453)['data'] == b'\x01\x02'
+
+
+def test_v2_swap_calldata_matches_web3_encoding(monkeypatch, fake_account):
+    import trading
+    from abi import UNISWAP_V2_ROUTER_ABI
+
+    monkeypatch.setattr(trading.time, 'time', lambda: 1_700_000_000)
+    router = Web3().eth.contract(address=ROUTER, abi=UNISWAP_V2_ROUTER_ABI)
+    path = [TOKEN_IN, TOKEN_OUT]
+    expected = router.encode_abi('swapExactTokensForTokens', args=[
+        10**15, 123, path, RECIPIENT, 1_700_000_000 + trading.DEADLINE_OFFSET])
+
+    swap_fn, _ = trading._prepare_uniswap_v2_swap({'address': ROUTER}, 10**15, path, min_amount_out_wei=123)
+    assert swap_fn.address == ROUTER
+    assert Web3.to_hex(swap_fn.data) == expected
+
+
+def _already_known_for_nonce_7(method, params):
+    assert method == 'eth_sendRawTransaction'
+    if params == ['0x07']:
+        return {'error': {'code': -32000, 'message': 'already known'}}
+    return Web3.keccak(hexstr=params[0]).to_0x_hex()
+
+
+def test_send_transactions_broadcasts_one_batch(rpc, fake_account):
+    import trading
+    provider = rpc(_already_known_for_nonce_7, write=True)
+
+    assert trading._send_transactions([{'nonce': 7}, {'nonce': 8}]) == [Web3.keccak(b'\x07'), Web3.keccak(b'\x08')]
+    assert provider.batches == [[('eth_sendRawTransaction', ['0x07']), ('eth_sendRawTransaction', ['0x08'])]]
+    assert provider.requests == []
+
+
+def test_send_transactions_raises_rejected_legs_from_the_batch(rpc, fake_account):
+    import trading
+    from web3.exceptions import Web3RPCError
+    provider = rpc(lambda method, params: {'error': {'code': -32000, 'message': 'nonce too low'}}, write=True)
+
+    with pytest.raises(Web3RPCError, match="nonce too low"):
+        trading._send_transactions([{'nonce': 7}, {'nonce': 8}])
+    # a rejected leg is not re-sent one by one
+    assert provider.requests == []
+
+
+def test_send_transactions_pauses_trading_on_a_leg_queued_behind_a_rejected_one(monkeypatch, rpc, fake_account):
+    import trading
+    from web3.exceptions import Web3RPCError
+    monkeypatch.setattr(trading, '_orphaned_tx', None)
+
+    def responder(method, params):
+        if params == ['0x07']:
+            return {'error': {'code': -32000, 'message': 'insufficient funds for gas * price + value'}}
+        return Web3.keccak(HexBytes(params[0])).to_0x_hex()
+
+    rpc(responder, write=True)
+    with pytest.raises(Web3RPCError, match="insufficient funds"):
+        trading._send_transactions([{'nonce': 7}, {'nonce': 8}])
+    sell_hash = Web3.keccak(b'\x08')
+    assert trading._orphaned_tx == (8, sell_hash)
+
+    mined_nonce = {'value': 7}
+    queued = {'hash': sell_hash.to_0x_hex(), 'nonce': '0x8', 'blockHash': None, 'blockNumber': None,
+              'transactionIndex': None, 'from': RECIPIENT, 'to': ROUTER, 'value': '0x0', 'gas': '0x5208',
+              'gasPrice': '0x1', 'input': '0x', 'type': '0x0', 'v': '0x1b', 'r': '0x1', 's': '0x1'}
+
+    def reads(method, params):
+        if method == 'eth_getTransactionCount':
+            return hex(mined_nonce['value'])
+        return queued if method == 'eth_getTransactionByHash' else None
+
+    rpc(reads)
+    # the buy's nonce is still open: a new buy would fill it and run the stale sell
+    assert trading._orphaned_tx_pending()
+    mined_nonce['value'] = 9
+    assert not trading._orphaned_tx_pending()
+    assert trading._orphaned_tx is None
+
+    # a transaction the node dropped clears the pause as well
+    trading._orphaned_tx = (8, sell_hash)
+    mined_nonce['value'], queued = 7, None
+    assert not trading._orphaned_tx_pending()
+
+
+def test_send_transactions_falls_back_to_serial_sends(rpc, fake_account):
+    import trading
+    provider = rpc(_already_known_for_nonce_7, write=True, batching=False)
+
+    assert trading._send_transactions([{'nonce': 7}, {'nonce': 8}]) == [Web3.keccak(b'\x07'), Web3.keccak(b'\x08')]
+    assert provider.requests == [('eth_sendRawTransaction', ['0x07']), ('eth_sendRawTransaction', ['0x08'])]
+
+
+def test_is_retriable_separates_transient_from_permanent_errors():
+    from requests import Response
+    from requests.exceptions import HTTPError
+    from web3.exceptions import BadFunctionCallOutput, Web3RPCError
+    from trading import _is_retriable
+
+    def http_error(status):
+        response = Response()
+        response.status_code = status
+        return HTTPError(response=response)
+
+    assert _is_retriable(TimeoutError())
+    assert _is_retriable(http_error(429))
+    assert _is_retriable(http_error(502))
+    assert not _is_retriable(http_error(400))
+    assert not _is_retriable(BadFunctionCallOutput("no code at address"))
+    assert _is_retriable(Web3RPCError("{'code': -32000, 'message': 'header not found'}"))
+    assert not _is_retriable(Web3RPCError("{'code': -32000, 'message': 'nonce too low'}"))
+    assert not _is_retriable(Web3RPCError("{'code': -32000, 'message': 'already known'}"))
+
+
+def test_solidly_swap_calldata_matches_web3_encoding(monkeypatch, fake_account):
+    import trading
+    from abi import SOLIDLY_ROUTER_ABI
+
+    factory = "0x420DD381b31aEf6683db6B902084cB0FFECe40Da"
+    monkeypatch.setattr(trading, 'has_code', lambda address: True)
+    monkeypatch.setattr(trading.time, 'time', lambda: 1_700_000_000)
+    router = Web3().eth.contract(address=ROUTER, abi=SOLIDLY_ROUTER_ABI)
+    expected = router.encode_abi('swapExactTokensForTokens', args=[
+        10**15, 123, [(TOKEN_IN, TOKEN_OUT, False, factory)], RECIPIENT, 1_700_000_000 + trading.DEADLINE_OFFSET])
+
+    router_info = {'address': ROUTER, 'version': 2, 'type': 'solidly', 'factory': factory}
+    swap_fn, _ = trading._prepare_solidly_swap('aerodrome', router_info, 10**15, TOKEN_IN, TOKEN_OUT,
+                                               pair_address=ROUTER, min_amount_out_wei=123)
+    assert Web3.to_hex(swap_fn.data) == expected
+
+
+def test_gas_limit_follows_observed_gas_used(monkeypatch):
+    import trading
+    monkeypatch.setattr(trading, '_max_gas_used', {})
+    route = ('aerodrome', TOKEN_IN, TOKEN_OUT)
+
+    assert trading._gas_limit(route) == trading.MAX_GAS_LIMIT
+    trading._record_gas_used(route, {'status': 1, 'gasUsed': 150_000})
+    assert trading._gas_limit(route) == int(150_000 * trading.GAS_LIMIT_HEADROOM)
+    # cheaper runs never pull the limit below the costliest one seen
+    for _ in range(20):
+        trading._record_gas_used(route, {'status': 1, 'gasUsed': 80_000})
+    assert trading._gas_limit(route) == int(150_000 * trading.GAS_LIMIT_HEADROOM)
+    # a revert may have been out of gas: go back to the safe ceiling
+    trading._record_gas_used(route, {'status': 0, 'gasUsed': 130_000})
+    assert trading._gas_limit(route) == trading.MAX_GAS_LIMIT
+
+
+def test_send_raw_raises_rpc_errors(rpc):
+    import trading
+    from web3.exceptions import Web3RPCError
+    provider = rpc(lambda method, params: {'error': {'code': -32000, 'message': 'nonce too low'}}, write=True)
+
+    with pytest.raises(Web3RPCError, match="nonce too low"):
+        trading._send_raw(FakeSigned({'nonce': 2}))
+    assert provider.requests == [('eth_sendRawTransaction', ['0x02'])]
+
+
+def test_send_raw_treats_already_known_as_sent(rpc):
+    import trading
+    rpc(_already_known_for_nonce_7, write=True)
+
+    # the node already holds the transaction: the trade continues with its hash
+    assert trading._send_raw(FakeSigned({'nonce': 7})) == Web3.keccak(b'\x07')
+    assert trading._send_raw(FakeSigned({'nonce': 8})) == Web3.keccak(b'\x08')
+
+
+@pytest.fixture
+def pipelined_trade(monkeypatch, fake_account):
+    """
+    execute_trade with every chain interaction stubbed: 1 base token (10**6 wei at 6 decimals)
+    buys at least 1000 token wei (the slippage minimum), and the test sets the receipts.
+    run(...) returns what the trade sent and reported.
+    """
+    import trading
+
+    seen = {'sent_together': [], 'sent_alone': [], 'pnl': [], 'approvals': 0, 'parsed': {}}
+    monkeypatch.setattr(trading, 'PIPELINE_SELL_LEG', True)
+    monkeypatch.setattr(trading, 'BASE_CURRENCY_ADDRESS', TOKEN_OUT)
+    monkeypatch.setattr(trading, 'TRADE_AMOUNT_BASE_TOKEN', 1.0)
+    monkeypatch.setattr(trading, '_orphaned_tx', None)
+    monkeypatch.setattr(trading, '_max_gas_used', {})
+    monkeypatch.setattr(trading, 'get_pool_router_info', lambda pool: {'version': 2, 'type': 'uniswap_v2'})
+    monkeypatch.setattr(trading, 'get_contract', lambda address, abi_key: Web3().eth.contract(
+        address=address, abi=[{'type': 'function', 'name': 'balanceOf', 'stateMutability': 'view',
+                               'inputs': [{'name': 'a', 'type': 'address'}],
+                               'outputs': [{'name': '', 'type': 'uint256'}]}]))
+    monkeypatch.setattr(trading, 'get_token_unit', lambda token: 10**6)
+    monkeypatch.setattr(trading, 'get_decimals', lambda token: 6)
+    monkeypatch.setattr(trading, 'get_chain_id', lambda: 8453)
+    monkeypatch.setattr(trading, '_quote_off_chain', lambda pool, amount, selling, router_info=None: None)
+    monkeypatch.setattr(trading, '_calc_min_amount_out', lambda *args: 1000)
+    monkeypatch.setattr(trading, '_calc_min_amount_out_sell', lambda *args: 900)
+    monkeypatch.setattr(trading, '_build_swap', lambda *args, **kwargs: (EncodedCall(ROUTER, b''), None))
+    monkeypatch.setattr(trading, '_send_transactions', lambda txns: seen['sent_together'].append(txns) or
+                        [HexBytes(b'\x01' * 32), HexBytes(b'\x02' * 32)])
+    monkeypatch.setattr(trading, '_send_raw', lambda signed: seen['sent_alone'].append(signed) or HexBytes(b'\x03' * 32))
+    monkeypatch.setattr(trading, '_warm_swap', lambda *args: None)
+    monkeypatch.setattr(trading, '_report_trade_pnl', lambda amount_in, amount_out, *args: seen['pnl'].append((amount_in, amount_out)))
+
+    def count_approvals(*args):
+        seen['approvals'] += 1
+
+    monkeypatch.setattr(trading, '_post_trade_approvals', count_approvals)
+    monkeypatch.setattr(trading, '_parse_receipt_for_amount_out',
+                        lambda receipt, router_info, dex, token, decimals: seen['parsed'][token])
+
+    def run(buy_receipt, sell_receipt=None, held=0, bought=1100, sold_for=1050):
+        seen['parsed'].update({TOKEN_IN: bought, TOKEN_OUT: sold_for})
+
+        def preflight(fn, *args, **kwargs):
+            if fn is not trading._preflight_reads:
+                return fn(*args, **kwargs)
+            # (base balance, token balance), base fee, priority fee, nonce
+            return ([5 * 10**6, held] if args[0] else []), 10**9, 5, 3
+
+        monkeypatch.setattr(trading, 'resilient_rpc_call', preflight)
+        monkeypatch.setattr(trading, '_wait_for_receipts', lambda hashes, sent_at=None: [buy_receipt, sell_receipt])
+        monkeypatch.setattr(trading, '_wait_for_receipt', lambda tx_hash, sent_at=None: buy_receipt)
+        pool = {'dex': 'baseswap', 'pairAddress': ROUTER, 'price': 1.0}
+        trading.execute_trade(pool, dict(pool, dex='alienbase'), 1.0, TOKEN_IN, {'name': 'TKN'})
+        return seen
+
+    return run
+
+
+def _receipt(status):
+    return {'status': status, 'gasUsed': 100_000, 'effectiveGasPrice': 1}
+
+
+def test_pipelined_trade_values_the_tokens_kept_above_the_sold_minimum(pipelined_trade):
+    seen = pipelined_trade(_receipt(1), _receipt(1))
+
+    (buy, sell), = seen['sent_together']
+    assert (buy['nonce'], sell['nonce']) == (3, 4)
+    # 1000 sold for 1050 base: the 100 kept are worth 105 more at that price
+    assert seen['pnl'] == [(10**6, 1050 + 105)]
+    assert seen['approvals'] == 1
+
+
+def test_pipelined_sell_revert_still_finishes_the_trade(pipelined_trade):
+    seen = pipelined_trade(_receipt(1), _receipt(0))
+
+    assert len(seen['sent_together']) == 1
+    assert seen['pnl'] == []
+    assert seen['approvals'] == 1
+
+
+def test_pipelined_buy_revert_stops_before_approvals(pipelined_trade):
+    seen = pipelined_trade(_receipt(0), _receipt(0))
+
+    assert len(seen['sent_together']) == 1
+    assert (seen['pnl'], seen['approvals']) == ([], 0)
+
+
+def test_trade_is_not_pipelined_while_the_wallet_holds_the_token(pipelined_trade):
+    # Holding buy_min_out already, a pipelined sell could run without the buy: the buy goes
+    # out alone (and here reverts, ending the trade)
+    seen = pipelined_trade(_receipt(0), held=1000)
+
+    assert seen['sent_together'] == []
+    assert len(seen['sent_alone']) == 1
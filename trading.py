@@ -1,40 +1,154 @@
 import time
+import random
 import logging
 from eth_abi import encode
+from eth_utils import function_signature_to_4byte_selector
+from hexbytes import HexBytes
+from requests.exceptions import HTTPError
+from web3.exceptions import (BadFunctionCallOutput, ContractLogicError, MismatchedABI, TimeExhausted,
+                             TransactionNotFound, Web3RPCError, Web3ValidationError)
+from web3._utils.method_formatters import receipt_formatter
 from web3.logs import DISCARD
 from config import (
-    w3, account, PRIVATE_KEY, MAX_GAS_LIMIT, DEX_ROUTERS,
+    w3, w3_write, account, MAX_GAS_LIMIT,
     BASE_CURRENCY_ADDRESS, TRADE_AMOUNT_BASE_TOKEN,
     SLIPPAGE_TOLERANCE_PERCENT, DEADLINE_OFFSET,
     LIQUIDITY_IMPACT_THRESHOLD, BALANCE_CHECK_RETRIES,
-    BALANCE_CHECK_DELAY, TX_RECEIPT_TIMEOUT,
-    ARB_CONTRACT_ADDRESS, ARB_CONTRACT_ABI
+    BALANCE_CHECK_DELAY, TX_RECEIPT_TIMEOUT, GAS_LIMIT_HEADROOM,
+    RECEIPT_POLL_INITIAL_DELAY, RECEIPT_POLL_INTERVAL, RECEIPT_POLL_MAX_INTERVAL,
+    ARB_CONTRACT_ADDRESS, ARB_CONTRACT_ABI,
+    RPC_MAX_RETRIES, RPC_BACKOFF_BASE, RPC_BACKOFF_MAX, PIPELINE_SELL_LEG
 )
-from abi import (
-    ERC20_ABI, UNISWAP_V2_ROUTER_ABI, UNISWAP_V3_ROUTER_ABI, SOLIDLY_ROUTER_ABI,
-    UNISWAP_V3_POOL_ABI, UNISWAP_V3_FACTORY_ABI,
-    UNISWAP_V3_QUOTER_ABI, ONEINCH_V6_ROUTER_ABI,
-    ALIENBASE_V2_ROUTER_ABI, BALANCER_V2_ROUTER_ABI, BALANCER_POOL_ABI,
-    PANCAKE_V3_FACTORY_ABI, PANCAKE_V3_POOL_ABI, PANCAKE_V3_ROUTER_ABI, SWAAP_ROUTER_ABI, SWAAP_POOL_ABI
-)
-from dex_utils import find_router_info, check_and_approve_token, get_decimals
+from abi import ABIS
+from dex_utils import (get_pool_router_info, check_and_approve_token, get_decimals, get_token_unit, has_code,
+                       get_chain_id,
+                       get_v2_amount_out, get_v3_spot_amount_out, get_contract, multicall, build_multicall,
+                       decode_multicall, solidly_stable_pools, MAX_UINT256, V3_FEE_TIERS, ZERO_ADDRESS)
 
 # --- DEX type constants (must match ArbitrageExecutor.sol) ---
 DEX_V2 = 0
 DEX_V3 = 1
 DEX_SOLIDLY = 2
 
+# The executor ABI comes from build artifacts, so register it alongside the static ones
+if ARB_CONTRACT_ABI:
+    ABIS['ARB_CONTRACT'] = ARB_CONTRACT_ABI
+
+# V3 pools that passed validation: (factory, pair, token_in, token_out) -> (fee, pool, validated_at)
+_validated_v3_pools = {}
+V3_POOL_VALIDATION_TTL = 10  # seconds
+
+# Balancer poolIds are immutable per pool address
+_balancer_pool_ids = {}
+
 # Cache of tokens that failed simulation (likely honeypots)
 _failed_tokens = set()
 
+# Highest gasUsed seen per route (dex, token_in, token_out), sizing gas limits from what the
+# route has actually cost instead of always reserving MAX_GAS_LIMIT. The maximum, not an average:
+# a limit below the route's worst observed cost would make that path revert out of gas.
+_max_gas_used = {}
+
+# (nonce, tx_hash) of a batched leg the node accepted after an earlier leg was rejected, e.g.
+# a pipelined sell queued at nonce + 1 behind a rejected buy. Until that nonce is used or the
+# node drops the transaction, a new trade's buy would fill the gap and run the stale leg.
+_orphaned_tx = None
+
+# --- Receipt parsing ---
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_EVENT_TOPIC = HexBytes("0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef")
+# Our address as a 32-byte indexed topic, so logs can be matched with a bytes compare
+ACCOUNT_TOPIC = HexBytes(bytes(12) + bytes.fromhex(account.address[2:])) if account else None
+
+# --- Pre-encoded router calls ---
+# ABI type of the V3 ExactInputSingleParams struct (shared by Uniswap and Pancake routers)
+V3_EXACT_INPUT_SINGLE_PARAMS = "(address,address,uint24,address,uint256,uint256,uint160)"
+V3_EXACT_INPUT_SINGLE_SELECTOR = function_signature_to_4byte_selector(
+    f"exactInputSingle({V3_EXACT_INPUT_SINGLE_PARAMS})")
+PANCAKE_V3_EXACT_INPUT_SINGLE_SELECTOR = function_signature_to_4byte_selector(
+    f"exactInputSingle({V3_EXACT_INPUT_SINGLE_PARAMS},uint256)")
+# swapExactTokensForTokens(amountIn, amountOutMin, path, to, deadline), shared by V2 routers
+V2_SWAP_EXACT_TOKENS_ARGS = ['uint256', 'uint256', 'address[]', 'address', 'uint256']
+V2_SWAP_EXACT_TOKENS_SELECTOR = function_signature_to_4byte_selector(
+    f"swapExactTokensForTokens({','.join(V2_SWAP_EXACT_TOKENS_ARGS)})")
+# Solidly routers take a Route(from, to, stable, factory)[] instead of an address path
+SOLIDLY_SWAP_EXACT_TOKENS_ARGS = ['uint256', 'uint256', '(address,address,bool,address)[]', 'address', 'uint256']
+SOLIDLY_SWAP_EXACT_TOKENS_SELECTOR = function_signature_to_4byte_selector(
+    f"swapExactTokensForTokens({','.join(SOLIDLY_SWAP_EXACT_TOKENS_ARGS)})")
+
+
+# Node errors that state a fact about the account or transaction; asking again can't change them
+PERMANENT_RPC_ERRORS = ("nonce too low", "already known", "insufficient funds", "replacement transaction underpriced")
+
+
+def _is_retriable(err):
+    """
+    True for failures that may succeed on a second attempt (timeouts, dropped connections,
+    rate limits, 5xx). Reverts, missing code, ABI/validation errors and nonce/funds
+    rejections are permanent.
+    """
+    if isinstance(err, (ContractLogicError, BadFunctionCallOutput, MismatchedABI, Web3ValidationError, TypeError)):
+        return False
+    if isinstance(err, Web3RPCError):
+        message = str(err).lower()
+        return not any(reason in message for reason in PERMANENT_RPC_ERRORS)
+    if isinstance(err, HTTPError) and err.response is not None:
+        return err.response.status_code == 429 or err.response.status_code >= 500
+    return True
+
+
+def resilient_rpc_call(fn, *args, **kwargs):
+    """
+    Calls fn(*args, **kwargs) — pass the callable and its arguments directly rather than a
+    lambda — and retries transient RPC failures (timeouts, dropped connections, rate limits)
+    with decorrelated jitter, so concurrent retries don't re-fire in lockstep.
+    Permanent failures (see _is_retriable) are raised immediately. Only use for idempotent reads.
+    """
+    wait = RPC_BACKOFF_BASE
+    for attempt in range(RPC_MAX_RETRIES + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == RPC_MAX_RETRIES or not _is_retriable(e):
+                raise
+            wait = min(RPC_BACKOFF_MAX, random.uniform(RPC_BACKOFF_BASE, wait * 3))
+            logging.debug("RPC call failed (%s), retry %s/%s in %.2fs", e, attempt + 1, RPC_MAX_RETRIES, wait)
+            time.sleep(wait)
+
+
+class EncodedCall:
+    """
+    A router call whose calldata is already ABI-encoded.
+    Exposes the subset of web3's ContractFunction interface used by the trade path,
+    so callers can treat it like `router.functions.xxx(...)`.
+    """
+
+    def __init__(self, to, data):
+        self.address = to
+        self.data = data
+
+    def build_transaction(self, payload):
+        return {**payload, 'to': self.address, 'data': self.data, 'value': payload.get('value', 0)}
+
+    def call(self, payload=None):
+        return w3.eth.call({**(payload or {}), 'to': self.address, 'data': self.data})
+
+
+def _encode_v2_swap(router_address, amount_in_wei, min_amount_out_wei, path):
+    """swapExactTokensForTokens encoded against the precomputed selector, paying our account."""
+    deadline = int(time.time()) + DEADLINE_OFFSET
+    calldata = V2_SWAP_EXACT_TOKENS_SELECTOR + encode(
+        V2_SWAP_EXACT_TOKENS_ARGS, [amount_in_wei, min_amount_out_wei, path, account.address, deadline])
+    return EncodedCall(router_address, calldata)
+
 
 def _prepare_1inch_swap(router_info: dict, amount_in_wei: int, token_in: str, token_out: str,
                         min_amount_out_wei: int = 0):
     """
     Prepares a swap transaction for the 1inch Aggregation router using on-chain calls.
     """
-    logging.info("  - Preparing 1inch on-chain swap...")
-    router = w3.eth.contract(address=router_info['address'], abi=ONEINCH_V6_ROUTER_ABI)
+    logging.debug("  - Preparing 1inch on-chain swap...")
+    router = get_contract(router_info['address'], 'ONEINCH_V6_ROUTER')
 
     # 1inch default executor for Base network.
     EXECUTOR_ADDR = "0x1111111111111111111111111111111111111111"
@@ -42,7 +156,7 @@ def _prepare_1inch_swap(router_info: dict, amount_in_wei: int, token_in: str, to
     # Empty data, so the executor tries to find the best route.
     executor_data = b""
 
-    logging.info(f"  - 1inch Min Amount Out: {min_amount_out_wei}")
+    logging.debug("  - 1inch Min Amount Out: %s", min_amount_out_wei)
 
     final_desc = (
         token_in,               # srcToken
@@ -70,35 +184,34 @@ def _prepare_solidly_swap(
 ):
     """
     Build a Solidly-style swap call.
-    Assumes a volatile pool for speed.
+    Routes stable pools recorded at discovery as stable, everything else as volatile.
     """
     factory = router_info.get("factory")
     if not factory:
         raise ValueError(f"{dex_name}: no factory address in config")
 
-    logging.info(f"  - Solidly router detected ({dex_name}).")
+    logging.debug("  - Solidly router detected (%s).", dex_name)
 
-    if not pair_address or not w3.eth.get_code(pair_address):
+    if not has_code(pair_address):
         raise ValueError(f"{dex_name}: No valid pair_address provided for solidly swap.")
 
-    logging.info(f"  - Using provided pool address: {pair_address}")
+    logging.debug("  - Using provided pool address: %s", pair_address)
 
-    # For speed, we assume the pool is volatile. This is the most common case.
-    # The transaction may fail if the pool is stable.
-    final_is_stable = False
-
-    router = w3.eth.contract(router_info["address"], abi=SOLIDLY_ROUTER_ABI)
+    # Discovery already read both getPool variants in one multicall and recorded the stable
+    # pools, so no factory probe is needed; anything unknown is treated as volatile.
+    final_is_stable = pair_address in solidly_stable_pools
 
     final_routes = [(token_in, token_out, final_is_stable, factory)]
-    swap_fn = router.functions.swapExactTokensForTokens(
+    calldata = SOLIDLY_SWAP_EXACT_TOKENS_SELECTOR + encode(SOLIDLY_SWAP_EXACT_TOKENS_ARGS, [
         amount_in_wei,
         min_amount_out_wei,
         final_routes,
         account.address,
         int(time.time()) + DEADLINE_OFFSET,
-    )
+    ])
+    swap_fn = EncodedCall(router_info["address"], calldata)
 
-    logging.info(f"  - MinOut = {min_amount_out_wei}")
+    logging.debug("  - MinOut = %s", min_amount_out_wei)
     return swap_fn, min_amount_out_wei
 
 def _prepare_alien_base_swap(
@@ -115,17 +228,14 @@ def _prepare_alien_base_swap(
     Prepares an Alien Base (Uniswap-V2 style) swap.
     """
     if pair_address:
-        logging.info(f"  - Alien Base V2 Using provided pool address: {pair_address}")
+        logging.debug("  - Alien Base V2 Using provided pool address: %s", pair_address)
 
     path = [token_in, token_out]
-    router_contract = w3.eth.contract(address=router_info['address'], abi=ALIENBASE_V2_ROUTER_ABI)
 
-    logging.info(f"  - Alien Base V2 Path: {path}")
-    logging.info(f"  - Alien Base V2 Min Amount Out (wei): {min_amount_out_wei}")
+    logging.debug("  - Alien Base V2 Path: %s", path)
+    logging.debug("  - Alien Base V2 Min Amount Out (wei): %s", min_amount_out_wei)
 
-    swap_function = router_contract.functions.swapExactTokensForTokens(
-        amount_in_wei, min_amount_out_wei, path, account.address, int(time.time()) + DEADLINE_OFFSET
-    )
+    swap_function = _encode_v2_swap(router_info['address'], amount_in_wei, min_amount_out_wei, path)
     return swap_function, min_amount_out_wei
 
 def _prepare_balancer_v2_swap(
@@ -135,22 +245,21 @@ def _prepare_balancer_v2_swap(
         token_out: str,
         pair_address: str,
         min_amount_out_wei: int = 0,
-        pool_abi=None
+        pool_abi_key='BALANCER_POOL'
     ):
     """Prepares a swap for a Balancer V2-style DEX (Balancer, Swaap, etc.)."""
     if not pair_address:
         raise ValueError("Balancer V2 swaps require a pair_address (pool address).")
 
-    if pool_abi is None:
-        pool_abi = BALANCER_POOL_ABI
-
-    logging.info(f"  - Balancer V2 router detected. Using pool: {pair_address}")
+    logging.debug("  - Balancer V2 router detected. Using pool: %s", pair_address)
 
-    # Get the poolId from the pool contract
-    pool_contract = w3.eth.contract(address=pair_address, abi=pool_abi)
-    pool_id = pool_contract.functions.getPoolId().call()
+    # Get the poolId from the pool contract (once per pool)
+    if pair_address not in _balancer_pool_ids:
+        pool_contract = get_contract(pair_address, pool_abi_key)
+        _balancer_pool_ids[pair_address] = pool_contract.functions.getPoolId().call()
+    pool_id = _balancer_pool_ids[pair_address]
 
-    router_contract = w3.eth.contract(address=router_info['address'], abi=BALANCER_V2_ROUTER_ABI)
+    router_contract = get_contract(router_info['address'], 'BALANCER_V2_ROUTER')
 
     # For a GIVEN_IN swap, we specify the exact input amount.
     swap_kind = 0  # 0 for GIVEN_IN
@@ -174,7 +283,7 @@ def _prepare_balancer_v2_swap(
 
     deadline = int(time.time()) + DEADLINE_OFFSET
 
-    logging.info(f"  - Balancer V2 Min Amount Out (wei): {min_amount_out_wei}")
+    logging.debug("  - Balancer V2 Min Amount Out (wei): %s", min_amount_out_wei)
 
     swap_function = router_contract.functions.swap(
         single_swap, funds, min_amount_out_wei, deadline
@@ -194,7 +303,7 @@ def _prepare_swaap_swap(
     """Prepares a swap for Swaap DEX (Balancer V2 compatible, different pool ABI)."""
     return _prepare_balancer_v2_swap(
         router_info, amount_in_wei, token_in, token_out,
-        pair_address, min_amount_out_wei, pool_abi=SWAAP_POOL_ABI
+        pair_address, min_amount_out_wei, pool_abi_key='SWAAP_POOL'
     )
 
 
@@ -202,144 +311,245 @@ def _prepare_uniswap_v2_swap(router_info, amount_in_wei, path, pair_address: str
                               min_amount_out_wei: int = 0):
     """Prepares a swap transaction for a Uniswap V2-style DEX."""
     if pair_address:
-        logging.info(f"  - V2 Using provided pool address: {pair_address}")
-    router_contract = w3.eth.contract(address=router_info['address'], abi=UNISWAP_V2_ROUTER_ABI)
-    logging.info(f"  - V2 Path: {path}")
-    logging.info(f"  - V2 Min Amount Out (wei): {min_amount_out_wei}")
-    swap_function = router_contract.functions.swapExactTokensForTokens(
-        amount_in_wei, min_amount_out_wei, path, account.address, int(time.time()) + DEADLINE_OFFSET
-    )
+        logging.debug("  - V2 Using provided pool address: %s", pair_address)
+    logging.debug("  - V2 Path: %s", path)
+    logging.debug("  - V2 Min Amount Out (wei): %s", min_amount_out_wei)
+    swap_function = _encode_v2_swap(router_info['address'], amount_in_wei, min_amount_out_wei, path)
     return swap_function, min_amount_out_wei
 
-def _prepare_uniswap_v3_swap(
-        dex_name: str,
-        router_info: dict,
-        amount_in_wei: int,
-        token_in: str,
-        token_out: str,
-        pair_address: str = None,
-        fee_bps_hint: int = None,
-        min_amount_out_wei: int = 0
-    ):
+def _find_v3_pool(dex_name, factory, pool_abi_key, token_in, token_out, pair_address, fee_bps_hint):
     """
-    Prepares a Uniswap-V3 style swap and **never** dies on
-    `quoteExactInputSingle` "execution reverted, no data".
+    Finds a live, liquid V3 pool for the pair — the provided one if it checks out, else
+    the first liquid fee tier from the factory. Returns (fee, pool_address).
     """
-    router_type = router_info.get('type')
-    if router_type == 'pancakeswap_v3':
-        factory_abi = PANCAKE_V3_FACTORY_ABI
-        pool_abi = PANCAKE_V3_POOL_ABI
-        logging.info(f"  - Using PancakeSwap V3 ABIs for {dex_name}.")
-    else: # Default to Uniswap V3
-        factory_abi = UNISWAP_V3_FACTORY_ABI
-        pool_abi = UNISWAP_V3_POOL_ABI
-        if router_type not in ['uniswap_v3', None]:
-            logging.info(f"  - Using default Uniswap V3 ABIs for '{dex_name}' (type: {router_type}).")
-
-    factory_address = router_info.get("factory")
-    if not factory_address:
-        raise ValueError(f"V3 DEX '{dex_name}' requires a 'factory' address")
-
-    logging.info(f"  - V3 DEX detected. Querying factory {factory_address} …")
-    factory = w3.eth.contract(factory_address, abi=factory_abi)
-
     # ------------------------------------------------------------------ #
     # ① find a pool that actually exists (code size > 0)
     # ------------------------------------------------------------------ #
     chosen_fee, pool_address = None, None
+    sqrt_price_x96 = liquidity = None
 
-    if pair_address and w3.eth.get_code(pair_address):
-        logging.info(f"  - Using provided pool address: {pair_address}")
-        pool_contract = w3.eth.contract(address=pair_address, abi=pool_abi)
+    if pair_address:
+        logging.debug("  - Using provided pool address: %s", pair_address)
+        pool_contract = get_contract(pair_address, pool_abi_key)
         try:
-            pool_fee = pool_contract.functions.fee().call()
+            # fee, slot0 and liquidity in one round trip; an address without code returns None
+            pool_fee, slot0, liquidity = multicall([
+                pool_contract.functions.fee(),
+                pool_contract.functions.slot0(),
+                pool_contract.functions.liquidity(),
+            ])
+        except Exception as e:
+            logging.warning(f"  - Could not read provided pool {pair_address}. Falling back to factory search. Error: {e}")
+            pool_fee = None
+        if pool_fee is None:
+            logging.warning(f"  - Could not confirm fee for provided pool {pair_address}. Falling back to factory search.")
+        else:
             if fee_bps_hint and fee_bps_hint != pool_fee:
                 logging.warning(f"  - Fee mismatch! DexScreener: {fee_bps_hint}, On-chain: {pool_fee}. Trusting on-chain fee.")
             chosen_fee = pool_fee
             pool_address = pair_address
-            logging.info(f"  - Successfully confirmed pool at fee tier {chosen_fee} bps.")
-        except Exception as e:
-            logging.warning(f"  - Could not confirm fee for provided pool {pair_address}. Falling back to factory search. Error: {e}")
+            sqrt_price_x96 = slot0[0] if slot0 else None
+            logging.debug("  - Successfully confirmed pool at fee tier %s bps.", chosen_fee)
 
     if not pool_address:
-        logging.info(f"  - No valid pool provided. Querying factory {factory_address} for a liquid pool...")
-        FEE_TIERS = [500, 3000, 10000, 2500, 100]
-        if fee_bps_hint and fee_bps_hint in FEE_TIERS:
-            FEE_TIERS.insert(0, FEE_TIERS.pop(FEE_TIERS.index(fee_bps_hint)))
-            logging.info(f"  - Prioritizing fee tier {fee_bps_hint} from DexScreener hint.")
-        zero = "0x" + "00" * 20
-        for fee in FEE_TIERS:
-            addr = factory.functions.getPool(token_in, token_out, fee).call()
-            if addr and addr != zero and w3.eth.get_code(addr):
-                # Found a potential pool, now check its liquidity before selecting it.
-                temp_pool = w3.eth.contract(address=addr, abi=pool_abi)
-                try:
-                    liquidity = temp_pool.functions.liquidity().call()
-                    if liquidity > 0:
-                        chosen_fee, pool_address = fee, addr
-                        logging.info(f"  - Pool {addr} at {fee} bps with liquidity {liquidity} selected")
-                        break  # Found a valid, liquid pool. Exit the loop.
-                    else:
-                        logging.info(f"  - Pool {addr} at {fee} bps found but has zero liquidity. Skipping.")
-                except Exception as e:
-                    logging.warning(f"  - Could not check liquidity for pool {addr}: {e}. Skipping.")
+        logging.debug("  - No valid pool provided. Querying factory %s for a liquid pool...", factory.address)
+        fee_tiers = list(V3_FEE_TIERS)
+        if fee_bps_hint and fee_bps_hint in fee_tiers:
+            fee_tiers.insert(0, fee_tiers.pop(fee_tiers.index(fee_bps_hint)))
+            logging.debug("  - Prioritizing fee tier %s from DexScreener hint.", fee_bps_hint)
+
+        # All fee tiers in one multicall, then slot0 + liquidity of every existing pool in a second
+        pool_addresses = multicall([factory.functions.getPool(token_in, token_out, fee) for fee in fee_tiers])
+        candidates = [(fee, addr) for fee, addr in zip(fee_tiers, pool_addresses) if addr and addr != ZERO_ADDRESS]
+        probes = []
+        for _, addr in candidates:
+            temp_pool = get_contract(addr, pool_abi_key)
+            probes += [temp_pool.functions.slot0(), temp_pool.functions.liquidity()]
+        try:
+            states = multicall(probes) if probes else []
+        except Exception as e:
+            logging.warning(f"  - Could not read candidate pools on {dex_name}: {e}.")
+            states = [None] * len(probes)
+
+        for i, (fee, addr) in enumerate(candidates):
+            slot0, pool_liquidity = states[2 * i], states[2 * i + 1]
+            if not slot0 or not pool_liquidity:
+                logging.debug("  - Pool %s at %s bps has no code or zero liquidity. Skipping.", addr, fee)
+                continue
+            chosen_fee, pool_address = fee, addr
+            sqrt_price_x96, liquidity = slot0[0], pool_liquidity
+            logging.debug("  - Pool %s at %s bps with liquidity %s selected", addr, fee, liquidity)
+            break  # Found a valid, liquid pool.
 
     if not pool_address:
         raise ValueError(f"No live, liquid V3 pool for pair on {dex_name}")
 
     # ------------------------------------------------------------------ #
-    # ② sanity-check pool status (slot0 & liquidity)
+    # ② sanity-check pool status (slot0 & liquidity, read above)
     # ------------------------------------------------------------------ #
-    pool = w3.eth.contract(pool_address, abi=pool_abi)
-    try:
-        sqrt_price_x96, *_ = pool.functions.slot0().call()
-    except Exception as e:
-        # Some V3 forks (like PancakeSwap) might have a slightly different slot0 return signature.
-        # If we can't decode it, we can't proceed with this pool.
-        logging.warning(f"  - Could not decode slot0 for pool {pool_address} on {dex_name}. It might be an incompatible V3 fork. Error: {e}")
+    if sqrt_price_x96 is None:
+        # Some V3 forks might have an incompatible slot0 signature; we can't proceed with this pool.
+        logging.warning(f"  - Could not decode slot0 for pool {pool_address} on {dex_name}. It might be an incompatible V3 fork.")
         raise ValueError(f"Could not decode slot0 for pool {pool_address}")
 
     if sqrt_price_x96 == 0:
         raise ValueError("Pool exists but never initialised (sqrtPriceX96 == 0)")
 
-    try:
-        liquidity = pool.functions.liquidity().call()
-    except Exception as e:
-        logging.warning(f"  - Could not read liquidity for pool {pool_address} on {dex_name}. It might be an incompatible V3 fork. Error: {e}")
-        raise ValueError(f"Could not read liquidity for pool {pool_address}")
-
-    if liquidity == 0:
+    if not liquidity:
         raise ValueError("Pool initialised but has zero active liquidity")
 
-    logging.info(f"  - Pool initialised with {liquidity} liquidity")
+    logging.debug("  - Pool initialised with %s liquidity", liquidity)
+    return chosen_fee, pool_address
 
-    swap_params = {
-        "tokenIn": token_in,
-        "tokenOut": token_out,
-        "fee": chosen_fee,
-        "recipient": account.address,
-        "amountIn": amount_in_wei,
-        "amountOutMinimum": min_amount_out_wei,
-        "sqrtPriceLimitX96": 0,
-    }
 
+def _trust_scanned_v3_pool(router_info, pool, token_in, token_out):
+    """
+    Records a scanned V3 pool as validated. Discovery took its address and fee tier from
+    factory.getPool, and the scan that priced it read a non-zero sqrtPriceX96 and in-range
+    liquidity, so the fee/slot0/liquidity re-read in _find_v3_pool would add a round trip
+    and no information. Only a scan younger than V3_POOL_VALIDATION_TTL is trusted, and the
+    validation expires as if it had been made at scan time.
+    """
+    if router_info.get('version') != 3 or not pool.get('sqrtPriceX96') or pool.get('feeBps') not in V3_FEE_TIERS:
+        return
+    scanned_at = pool.get('scanned_at')
+    if not pool.get('liquidity') or scanned_at is None or time.time() - scanned_at >= V3_POOL_VALIDATION_TTL:
+        return
+    cache_key = (router_info.get('factory'), pool['pairAddress'], token_in, token_out)
+    _validated_v3_pools[cache_key] = (pool['feeBps'], pool['pairAddress'], scanned_at)
+
+
+def _prepare_uniswap_v3_swap(
+        dex_name: str,
+        router_info: dict,
+        amount_in_wei: int,
+        token_in: str,
+        token_out: str,
+        pair_address: str = None,
+        fee_bps_hint: int = None,
+        min_amount_out_wei: int = 0
+    ):
+    """
+    Prepares a Uniswap-V3 style swap and **never** dies on
+    `quoteExactInputSingle` "execution reverted, no data".
+    """
+    router_type = router_info.get('type')
+    if router_type == 'pancakeswap_v3':
+        factory_abi_key = 'PANCAKE_V3_FACTORY'
+        pool_abi_key = 'PANCAKE_V3_POOL'
+        logging.debug("  - Using PancakeSwap V3 ABIs for %s.", dex_name)
+    else: # Default to Uniswap V3
+        factory_abi_key = 'UNISWAP_V3_FACTORY'
+        pool_abi_key = 'UNISWAP_V3_POOL'
+        if router_type not in ['uniswap_v3', None]:
+            logging.debug("  - Using default Uniswap V3 ABIs for '%s' (type: %s).", dex_name, router_type)
+
+    factory_address = router_info.get("factory")
+    if not factory_address:
+        raise ValueError(f"V3 DEX '{dex_name}' requires a 'factory' address")
+
+    logging.debug("  - V3 DEX detected. Querying factory %s …", factory_address)
+    factory = get_contract(factory_address, factory_abi_key)
+
+    # Pool facts are reused for V3_POOL_VALIDATION_TTL so a leg prepared speculatively
+    # (see execute_trade) is rebuilt without another round trip.
+    cache_key = (factory_address, pair_address, token_in, token_out)
+    validated = _validated_v3_pools.get(cache_key)
+    if validated and time.time() - validated[2] < V3_POOL_VALIDATION_TTL:
+        chosen_fee, pool_address, _ = validated
+        logging.debug("  - Reusing pool %s at %s bps validated %.2fs ago", pool_address, chosen_fee,
+                      time.time() - validated[2])
+    else:
+        chosen_fee, pool_address = _find_v3_pool(dex_name, factory, pool_abi_key, token_in, token_out,
+                                                 pair_address, fee_bps_hint)
+        _validated_v3_pools[cache_key] = (chosen_fee, pool_address, time.time())
+
+    # Positional ExactInputSingleParams: tokenIn, tokenOut, fee, recipient, amountIn, amountOutMinimum, sqrtPriceLimitX96
+    swap_params = (token_in, token_out, chosen_fee, account.address, amount_in_wei, min_amount_out_wei, 0)
+
+    # Encode calldata directly against the precomputed selector, skipping web3's
+    # per-call ABI lookup and argument normalization.
     if router_type == 'pancakeswap_v3':
-        router = w3.eth.contract(router_info["address"], abi=PANCAKE_V3_ROUTER_ABI)
         deadline = int(time.time()) + DEADLINE_OFFSET
-        logging.info(f"  - Preparing Pancake V3 swap with deadline...")
-        # Use keyword arguments for clarity to match the ABI definition
-        swap_fn = router.functions.exactInputSingle(params=swap_params, deadline=deadline)
+        logging.debug("  - Preparing Pancake V3 swap with deadline...")
+        calldata = PANCAKE_V3_EXACT_INPUT_SINGLE_SELECTOR + encode(
+            [V3_EXACT_INPUT_SINGLE_PARAMS, 'uint256'], [swap_params, deadline])
     else:  # Default to Uniswap V3
-        router = w3.eth.contract(router_info["address"], abi=UNISWAP_V3_ROUTER_ABI)
-        logging.info(f"  - Preparing Uniswap V3 swap...")
-        # Use keyword arguments for clarity to match the ABI definition
-        swap_fn = router.functions.exactInputSingle(params=swap_params)
+        logging.debug("  - Preparing Uniswap V3 swap...")
+        calldata = V3_EXACT_INPUT_SINGLE_SELECTOR + encode([V3_EXACT_INPUT_SINGLE_PARAMS], [swap_params])
+    swap_fn = EncodedCall(router_info["address"], calldata)
 
-    logging.info(f"  - V3 Min Amount Out (wei): {min_amount_out_wei}")
+    logging.debug("  - V3 Min Amount Out (wei): %s", min_amount_out_wei)
     # Gas estimation checks removed by user request.
     return swap_fn, min_amount_out_wei
 
 
+def _poll_receipts(tx_hashes):
+    """
+    One poll of the receipts of tx_hashes, None for those not mined yet. Several hashes go out
+    as one JSON-RPC batch straight to the provider: inside web3's batch_requests a single
+    pending transaction fails the whole batch. A transient RPC failure (see _is_retriable)
+    also counts as not mined yet, so the next poll retries it before the timeout runs out.
+    """
+    if len(tx_hashes) > 1:
+        try:
+            responses = w3.provider.make_batch_request(
+                [('eth_getTransactionReceipt', [HexBytes(tx_hash).to_0x_hex()]) for tx_hash in tx_hashes])
+            if isinstance(responses, list) and len(responses) == len(tx_hashes) and \
+                    not any(response.get('error') for response in responses):
+                return [receipt_formatter(response['result']) if response.get('result') else None
+                        for response in responses]
+            logging.debug("Receipt batch returned %s, polling one by one.", responses)
+        except Exception as e:
+            logging.debug("Receipt batch rejected (%s), polling one by one.", e)
+    receipts = []
+    for tx_hash in tx_hashes:
+        try:
+            receipts.append(w3.eth.get_transaction_receipt(tx_hash))
+        except TransactionNotFound:
+            receipts.append(None)
+        except Exception as e:
+            if not _is_retriable(e):
+                raise
+            logging.debug("Receipt poll for %s failed (%s), retrying next poll.", HexBytes(tx_hash).to_0x_hex(), e)
+            receipts.append(None)
+    return receipts
+
+
+def _wait_for_receipts(tx_hashes, timeout=TX_RECEIPT_TIMEOUT, sent_at=None):
+    """
+    Waits for the receipts of tx_hashes on Base's ~2s block cadence: a short initial delay,
+    tight polls around the expected block, then backing off to RECEIPT_POLL_MAX_INTERVAL
+    so a slow inclusion doesn't hammer the node. Every hash still pending is polled in each
+    round, so transactions in flight together are waited for together.
+    If sent_at is given, time already spent since sending counts towards the initial delay.
+    Returns the receipts in the order of tx_hashes.
+    """
+    deadline = time.time() + timeout
+    if sent_at is None:
+        time.sleep(RECEIPT_POLL_INITIAL_DELAY)
+    else:
+        time.sleep(max(0.0, RECEIPT_POLL_INITIAL_DELAY - (time.time() - sent_at)))
+    receipts = [None] * len(tx_hashes)
+    interval = RECEIPT_POLL_INTERVAL
+    while True:
+        pending = [i for i, receipt in enumerate(receipts) if receipt is None]
+        for i, receipt in zip(pending, _poll_receipts([tx_hashes[i] for i in pending])):
+            receipts[i] = receipt
+        if all(receipt is not None for receipt in receipts):
+            return receipts
+        if time.time() >= deadline:
+            pending = [tx_hash.hex() for tx_hash, receipt in zip(tx_hashes, receipts) if receipt is None]
+            raise TimeExhausted(f"Transactions {', '.join(pending)} are not in the chain after {timeout} seconds")
+        time.sleep(interval)
+        interval = min(RECEIPT_POLL_MAX_INTERVAL, interval * 2)
+
+
+def _wait_for_receipt(tx_hash, timeout=TX_RECEIPT_TIMEOUT, sent_at=None):
+    """Waits for a single transaction receipt, see _wait_for_receipts."""
+    return _wait_for_receipts([tx_hash], timeout, sent_at)[0]
+
+
 def _wait_for_balance_change(token_contract, owner_address, initial_balance,
                              retries=BALANCE_CHECK_RETRIES, delay=BALANCE_CHECK_DELAY):
     """
@@ -358,68 +568,334 @@ def _wait_for_balance_change(token_contract, owner_address, initial_balance,
     return token_contract.functions.balanceOf(owner_address).call() # return last known balance
 
 
-def _calc_min_amount_out(amount_in_wei, price, in_decimals, out_decimals):
+def _parse_receipt_for_amount_out(receipt, router_info, dex_name, token_out_addr, token_out_decimals):
+    """
+    Sums the token_out Transfer events paid to our account in a swap receipt.
+    Returns the amount received in wei, or 0 if the receipt holds no such transfer.
+    """
+    amount_out_wei = 0
+    for log in receipt['logs']:
+        # Emitter first: it rejects pool events and the input token's transfers in one compare
+        if log['address'] != token_out_addr:
+            continue
+        topics = log['topics']
+        if len(topics) == 3 and topics[0] == TRANSFER_EVENT_TOPIC and topics[2] == ACCOUNT_TOPIC:
+            # Transfer's only non-indexed field is the uint256 value: read the word directly
+            amount_out_wei += int.from_bytes(log['data'][:32], 'big')
+    logging.debug("  - %s (%s) receipt: %s received", dex_name, router_info.get('type', 'uniswap_v2'),
+                  amount_out_wei / 10 ** token_out_decimals)
+    return amount_out_wei
+
+
+# Slippage as an integer ratio so min-out math stays in exact wei arithmetic
+SLIPPAGE_DENOMINATOR = 10_000
+SLIPPAGE_NUMERATOR = SLIPPAGE_DENOMINATOR - round(SLIPPAGE_TOLERANCE_PERCENT * 100)
+
+
+def _apply_slippage(expected_out_wei):
+    """Minimum acceptable output for an expected output, given SLIPPAGE_TOLERANCE_PERCENT."""
+    return expected_out_wei * SLIPPAGE_NUMERATOR // SLIPPAGE_DENOMINATOR
+
+
+def _calc_min_amount_out(amount_in_wei, price, in_unit, out_unit):
     """
     Calculate minimum acceptable output based on expected price and slippage tolerance.
-    price = how much of out_token you get per 1 in_token (in human-readable units).
+    price = how much of in_token one out_token costs (in human-readable units), so for a
+    buy: WETH_amount / (WETH_per_token) = tokens.
     """
-    amount_in_human = amount_in_wei / (10 ** in_decimals)
-    expected_out_human = amount_in_human / price  # for buy: WETH_amount / (WETH_per_token) = tokens
-    slippage_factor = 1 - (SLIPPAGE_TOLERANCE_PERCENT / 100)
-    min_out_human = expected_out_human * slippage_factor
-    return int(min_out_human * (10 ** out_decimals))
+    # A float is an exact binary fraction, so num/den carries it into integer math losslessly
+    price_num, price_den = price.as_integer_ratio()
+    if price_num == 0:
+        return 0
+    expected_out_wei = amount_in_wei * price_den * out_unit // (price_num * in_unit)
+    return _apply_slippage(expected_out_wei)
 
 
-def _calc_min_amount_out_sell(amount_in_wei, price, in_decimals, out_decimals):
+def _calc_min_amount_out_sell(amount_in_wei, price, in_unit, out_unit):
     """
     Calculate minimum acceptable output for sell side.
-    price = how much of base_token you get per 1 target_token (in human-readable units).
+    price = how much of base_token you get per 1 target_token (in human-readable units), so for
+    a sell: token_amount * (WETH_per_token) = WETH.
+    """
+    price_num, price_den = price.as_integer_ratio()
+    expected_out_wei = amount_in_wei * price_num * out_unit // (price_den * in_unit)
+    return _apply_slippage(expected_out_wei)
+
+
+def _quote_off_chain(pool, amount_in_wei, selling, router_info=None):
     """
-    amount_in_human = amount_in_wei / (10 ** in_decimals)
-    expected_out_human = amount_in_human * price  # for sell: token_amount * (WETH_per_token) = WETH
-    slippage_factor = 1 - (SLIPPAGE_TOLERANCE_PERCENT / 100)
-    min_out_human = expected_out_human * slippage_factor
-    return int(min_out_human * (10 ** out_decimals))
+    Off-chain quote from the pool state the price scanner captured: V2 reserves
+    (token → base orientation) or the V3 sqrtPriceX96.
+    V2 pools are quoted at their router's feeBps from DEX_ROUTERS, or UniswapV2's 0.30 %.
+    Returns the expected output in wei, or None when the pool has no cached state.
+    """
+    reserve_token = pool.get('reserve_in')
+    reserve_base = pool.get('reserve_out')
+    if reserve_token and reserve_base:
+        fee_bps = (router_info or {}).get('feeBps', 30)
+        if selling:
+            return get_v2_amount_out(amount_in_wei, reserve_token, reserve_base, fee_bps)
+        return get_v2_amount_out(amount_in_wei, reserve_base, reserve_token, fee_bps)
+
+    sqrt_price_x96 = pool.get('sqrtPriceX96')
+    if sqrt_price_x96:
+        # Selling the target token swaps token0 -> token1 exactly when the target is token0
+        zero_for_one = pool['token_is_token0'] == selling
+        return get_v3_spot_amount_out(amount_in_wei, sqrt_price_x96, zero_for_one, pool.get('feeBps', 0))
+
+    return None
+
+
+def _preflight_reads(calls, fetch_nonce=True):
+    """
+    Reads the Multicall3 `calls` (if any), the latest block's base fee, max_priority_fee and
+    (unless fetch_nonce is False) the account nonce in a single JSON-RPC batch. Providers that
+    reject batches get the same requests serially.
+    The base fee comes from the block header: nodes run eth_call without a gas price, so the
+    BASEFEE opcode (Multicall3.getBasefee) reads 0 there.
+    Returns (decoded multicall results, base_fee, max_priority_fee, nonce or None).
+    """
+    aggregate = build_multicall(calls) if calls else None
+    results, nonce = [], None
+    try:
+        with w3.batch_requests() as batch:
+            if aggregate is not None:
+                batch.add(aggregate)
+            batch.add(w3.eth._get_block('latest'))
+            batch.add(w3.eth._max_priority_fee())
+            if fetch_nonce:
+                batch.add(w3.eth._get_transaction_count(account.address))
+            responses = batch.execute()
+        if aggregate is not None:
+            results, *responses = responses
+        block, max_priority_fee, *rest = responses
+        if fetch_nonce:
+            nonce = rest[0]
+    except Exception as e:
+        logging.debug("JSON-RPC batch rejected (%s), falling back to serial requests.", e)
+        if aggregate is not None:
+            results = aggregate.call()
+        block = w3.eth.get_block('latest')
+        max_priority_fee = w3.eth.max_priority_fee
+        if fetch_nonce:
+            nonce = w3.eth.get_transaction_count(account.address)
+    decoded = decode_multicall(calls, results) if calls else []
+    return decoded, block['baseFeePerGas'], max_priority_fee, nonce
+
+
+def _build_swap_tx(swap_function, nonce, max_fee_per_gas, max_priority_fee, chain_id, gas=MAX_GAS_LIMIT):
+    """
+    Assembles the EIP-1559 transaction for a router call directly, instead of going through
+    build_transaction, which re-encodes the call and fills missing fields over RPC.
+    """
+    if isinstance(swap_function, EncodedCall):
+        data = swap_function.data
+    else:
+        data = swap_function._encode_transaction_data()
+    return {
+        'to': swap_function.address, 'data': data, 'value': 0, 'from': account.address,
+        'nonce': nonce, 'gas': gas, 'maxFeePerGas': max_fee_per_gas,
+        'maxPriorityFeePerGas': max_priority_fee, 'chainId': chain_id, 'type': 2,
+    }
+
+
+def _gas_limit(route):
+    """Highest observed gasUsed of route plus headroom; MAX_GAS_LIMIT until it has been seen."""
+    gas_used = _max_gas_used.get(route)
+    if gas_used is None:
+        return MAX_GAS_LIMIT
+    return min(int(gas_used * GAS_LIMIT_HEADROOM), MAX_GAS_LIMIT)
+
+
+def _record_gas_used(route, receipt):
+    """Raises the route's maximum to a mined receipt's gasUsed; a revert (possibly out of gas) resets it."""
+    if receipt['status'] != 1:
+        _max_gas_used.pop(route, None)
+        return
+    _max_gas_used[route] = max(_max_gas_used.get(route, 0), receipt['gasUsed'])
+
+
+def _sent_hash(signed, response):
+    """
+    Transaction hash from an eth_sendRawTransaction response. "already known" means the node
+    already holds this exact transaction (e.g. a retried send that had landed), so it counts
+    as sent; any other error raises Web3RPCError.
+    """
+    error = response.get('error')
+    if error:
+        if "already known" in str(error).lower():
+            logging.debug("Transaction %s already known to the node.", HexBytes(signed.hash).to_0x_hex())
+            return HexBytes(signed.hash)
+        raise Web3RPCError(str(error), rpc_response=response)
+    return HexBytes(response['result'])
+
+
+def _send_raw(signed):
+    """
+    Broadcasts a signed transaction with a bare eth_sendRawTransaction on the write provider,
+    skipping web3's middleware and request/result formatters. Returns the transaction hash.
+    """
+    response = w3_write.provider.make_request(
+        'eth_sendRawTransaction', [HexBytes(signed.raw_transaction).to_0x_hex()])
+    return _sent_hash(signed, response)
+
+
+def _batch_hashes(txns, signed_txns, responses):
+    """
+    Transaction hashes from a batch of eth_sendRawTransaction responses. When a leg was
+    rejected, its error is raised once every response has been read; a later leg the node
+    accepted anyway is queued behind a nonce gap, so it is recorded in _orphaned_tx.
+    """
+    global _orphaned_tx
+    hashes, error = [], None
+    for txn, signed, response in zip(txns, signed_txns, responses):
+        try:
+            tx_hash = _sent_hash(signed, response)
+        except Web3RPCError as e:
+            error = error or e
+            continue
+        hashes.append(tx_hash)
+        if error is not None and _orphaned_tx is None:
+            _orphaned_tx = (txn['nonce'], tx_hash)
+            logging.error(f"  - Tx {tx_hash.hex()} (nonce {txn['nonce']}) was accepted after an earlier leg was "
+                          f"rejected and is queued behind the nonce gap. Trading pauses until it clears.")
+    if error is not None:
+        raise error
+    return hashes
+
+
+def _orphaned_tx_pending():
+    """
+    True while the leg recorded in _orphaned_tx may still run. It is cleared once the account's
+    mined nonce has moved past it or the node no longer knows the transaction.
+    """
+    global _orphaned_tx
+    if _orphaned_tx is None:
+        return False
+    nonce, tx_hash = _orphaned_tx
+    if w3.eth.get_transaction_count(account.address) > nonce:
+        _orphaned_tx = None
+        return False
+    try:
+        w3.eth.get_transaction(tx_hash)
+    except TransactionNotFound:
+        logging.info(f"  - Queued Tx {tx_hash.hex()} was dropped by the node, resuming trading.")
+        _orphaned_tx = None
+        return False
+    return True
+
+
+def _send_transactions(txns):
+    """
+    Signs txns and broadcasts them as one JSON-RPC batch of eth_sendRawTransaction on the
+    write provider, falling back to one request each. Returns the transaction hashes in order.
+    The batch goes straight to the provider: web3's batch_requests refuses sends.
+    """
+    signed_txns = [account.sign_transaction(txn) for txn in txns]
+    requests = [('eth_sendRawTransaction', [HexBytes(signed.raw_transaction).to_0x_hex()])
+                for signed in signed_txns]
+    try:
+        responses = w3_write.provider.make_batch_request(requests)
+    except Exception as e:
+        responses = e
+    if isinstance(responses, list) and len(responses) == len(signed_txns):
+        return _batch_hashes(txns, signed_txns, responses)
+    logging.debug("JSON-RPC batch rejected (%s), sending transactions one by one.", responses)
+    # A batch that reached the node before failing makes these "already known", which _send_raw accepts
+    return [_send_raw(signed) for signed in signed_txns]
+
+
+def warm_up_signer(chain_id):
+    """
+    Signs a throwaway transaction so the keccak/secp256k1 backends are loaded and their
+    caches populated before the first real trade, keeping that cost off the buy leg.
+    """
+    account.sign_transaction({
+        'to': account.address, 'value': 0, 'gas': 21000, 'maxFeePerGas': 1,
+        'maxPriorityFeePerGas': 1, 'nonce': 0, 'chainId': chain_id, 'type': 2,
+    })
+
+
+# --- Swap builder dispatch ---
+# Every builder takes the same arguments so buy and sell legs share one code path:
+# (dex_name, router_info, amount_in_wei, token_in, token_out, pair_address, fee_bps_hint, min_out)
+
+def _build_1inch_swap(dex_name, router_info, amount_in_wei, token_in, token_out, pair_address, fee_bps_hint, min_out):
+    return _prepare_1inch_swap(router_info, amount_in_wei, token_in, token_out, min_amount_out_wei=min_out)
+
+
+def _build_alien_base_swap(dex_name, router_info, amount_in_wei, token_in, token_out, pair_address, fee_bps_hint, min_out):
+    return _prepare_alien_base_swap(dex_name, router_info, amount_in_wei, token_in, token_out,
+                                    pair_address=pair_address, fee_bps_hint=fee_bps_hint,
+                                    min_amount_out_wei=min_out)
+
+
+def _build_solidly_swap(dex_name, router_info, amount_in_wei, token_in, token_out, pair_address, fee_bps_hint, min_out):
+    return _prepare_solidly_swap(dex_name, router_info, amount_in_wei, token_in, token_out,
+                                 pair_address=pair_address, min_amount_out_wei=min_out)
+
+
+def _build_balancer_v2_swap(dex_name, router_info, amount_in_wei, token_in, token_out, pair_address, fee_bps_hint, min_out):
+    return _prepare_balancer_v2_swap(router_info, amount_in_wei, token_in, token_out,
+                                     pair_address=pair_address, min_amount_out_wei=min_out)
+
+
+def _build_swaap_swap(dex_name, router_info, amount_in_wei, token_in, token_out, pair_address, fee_bps_hint, min_out):
+    return _prepare_swaap_swap(router_info, amount_in_wei, token_in, token_out,
+                               pair_address=pair_address, min_amount_out_wei=min_out)
+
 
+def _build_uniswap_v2_swap(dex_name, router_info, amount_in_wei, token_in, token_out, pair_address, fee_bps_hint, min_out):
+    return _prepare_uniswap_v2_swap(router_info, amount_in_wei, [token_in, token_out],
+                                    pair_address=pair_address, min_amount_out_wei=min_out)
 
-def _fresh_gas_params():
-    """Fetch current gas parameters from the network."""
-    max_priority_fee = w3.eth.max_priority_fee
-    latest_block = w3.eth.get_block('latest')
-    base_fee = latest_block['baseFeePerGas']
-    max_fee_per_gas = base_fee * 2 + max_priority_fee
-    return max_priority_fee, max_fee_per_gas
+
+def _build_uniswap_v3_swap(dex_name, router_info, amount_in_wei, token_in, token_out, pair_address, fee_bps_hint, min_out):
+    return _prepare_uniswap_v3_swap(dex_name, router_info, amount_in_wei, token_in, token_out,
+                                     pair_address=pair_address, fee_bps_hint=fee_bps_hint,
+                                     min_amount_out_wei=min_out)
+
+
+# Keyed by (version, type). A None version matches any version; a None type is the
+# default builder for that version.
+SWAP_BUILDERS = {
+    (None, '1inch'): _build_1inch_swap,
+    (None, 'alienbase'): _build_alien_base_swap,
+    (2, 'solidly'): _build_solidly_swap,
+    (2, 'balancer_v2'): _build_balancer_v2_swap,
+    (2, 'swaap_v2'): _build_swaap_swap,
+    (2, None): _build_uniswap_v2_swap,
+    (3, None): _build_uniswap_v3_swap,
+}
+
+
+def _get_swap_builder(router_type, version):
+    """Resolve the swap builder for a router, most specific key first."""
+    return (SWAP_BUILDERS.get((version, router_type))
+            or SWAP_BUILDERS.get((None, router_type))
+            or SWAP_BUILDERS.get((version, None)))
 
 
 def _build_swap(router_type, version, dex_name, router_info, amount_in_wei,
                 token_in, token_out, pair_address, fee_bps_hint, min_out):
     """Dispatch to the correct _prepare_*_swap based on router type/version."""
-    if router_type == '1inch':
-        return _prepare_1inch_swap(router_info, amount_in_wei, token_in, token_out,
-                                   min_amount_out_wei=min_out)
-    elif router_type == 'alienbase':
-        return _prepare_alien_base_swap(dex_name, router_info, amount_in_wei, token_in, token_out,
-                                        pair_address=pair_address, fee_bps_hint=fee_bps_hint,
-                                        min_amount_out_wei=min_out)
-    elif version == 2:
-        if router_type == 'solidly':
-            return _prepare_solidly_swap(dex_name, router_info, amount_in_wei, token_in, token_out,
-                                         pair_address=pair_address, min_amount_out_wei=min_out)
-        elif router_type == 'balancer_v2':
-            return _prepare_balancer_v2_swap(router_info, amount_in_wei, token_in, token_out,
-                                             pair_address=pair_address, min_amount_out_wei=min_out)
-        elif router_type == 'swaap_v2':
-            return _prepare_swaap_swap(router_info, amount_in_wei, token_in, token_out,
-                                       pair_address=pair_address, min_amount_out_wei=min_out)
-        else:  # Default to uniswap_v2
-            return _prepare_uniswap_v2_swap(router_info, amount_in_wei, [token_in, token_out],
-                                            pair_address=pair_address, min_amount_out_wei=min_out)
-    elif version == 3:
-        return _prepare_uniswap_v3_swap(dex_name, router_info, amount_in_wei, token_in, token_out,
-                                         pair_address=pair_address, fee_bps_hint=fee_bps_hint,
-                                         min_amount_out_wei=min_out)
-    else:
+    builder = _get_swap_builder(router_type, version)
+    if builder is None:
         raise NotImplementedError(f"DEX version {version} or type '{router_type}' is not supported.")
+    return builder(dex_name, router_info, amount_in_wei, token_in, token_out, pair_address, fee_bps_hint, min_out)
+
+
+def _warm_swap(router_info, dex_name, pool, token_in, token_out, expected_amount_in):
+    """
+    Builds a swap with the expected input and discards it. Run while the previous leg is
+    being mined, it front-loads the builder's pool reads into the caches the real build hits.
+    """
+    try:
+        _build_swap(router_info.get('type', 'uniswap_v2'), router_info['version'], dex_name, router_info,
+                    expected_amount_in, token_in, token_out, pair_address=pool['pairAddress'],
+                    fee_bps_hint=pool.get('feeBps'), min_out=0)
+    except Exception as e:
+        logging.debug("  - Speculative %s swap preparation failed (%s); the real build will retry.", dex_name, e)
 
 
 # --- Atomic Arbitrage via Smart Contract ---
@@ -446,7 +922,7 @@ def _encode_swap_data(dex_type, router_info, pool, min_amount_out=0):
         return encode(['uint24', 'uint256'], [fee, min_amount_out])
     elif dex_type == DEX_SOLIDLY:
         factory = router_info.get('factory', '0x' + '00' * 20)
-        stable = False  # assume volatile
+        stable = pool.get('stable', False)  # recorded at discovery; volatile otherwise
         return encode(['bool', 'address', 'uint256'], [stable, factory, min_amount_out])
     else:
         raise ValueError(f"Unknown dex type: {dex_type}")
@@ -463,7 +939,11 @@ def execute_trade_atomic(buy_pool, sell_pool, spread, token_address, token_info,
 
     # Skip tokens that have previously failed simulation (likely honeypots)
     if token_address in _failed_tokens:
-        logging.debug(f"Skipping {token_address} — previously failed simulation.")
+        logging.debug("Skipping %s — previously failed simulation.", token_address)
+        return
+
+    if resilient_rpc_call(_orphaned_tx_pending):
+        logging.warning(f"!!! TRADE SKIPPED: Tx {_orphaned_tx[1].hex()} is still queued at nonce {_orphaned_tx[0]}.")
         return
 
     token_name = token_info.get('name', token_address)
@@ -471,8 +951,8 @@ def execute_trade_atomic(buy_pool, sell_pool, spread, token_address, token_info,
 
     buy_dex_name = buy_pool['dex']
     sell_dex_name = sell_pool['dex']
-    buy_router_info = find_router_info(buy_dex_name, DEX_ROUTERS, pair_address=buy_pool.get('pairAddress'))
-    sell_router_info = find_router_info(sell_dex_name, DEX_ROUTERS, pair_address=sell_pool.get('pairAddress'))
+    buy_router_info = get_pool_router_info(buy_pool)
+    sell_router_info = get_pool_router_info(sell_pool)
 
     if not buy_router_info or not sell_router_info:
         logging.warning(f"Router info not found for {buy_dex_name} or {sell_dex_name}")
@@ -483,11 +963,9 @@ def execute_trade_atomic(buy_pool, sell_pool, spread, token_address, token_info,
     sell_type = _get_dex_type(sell_router_info)
 
     try:
-        arb_contract = w3.eth.contract(address=ARB_CONTRACT_ADDRESS, abi=ARB_CONTRACT_ABI)
-        base_decimals = get_decimals(BASE_CURRENCY_ADDRESS)
-
+        arb_contract = get_contract(ARB_CONTRACT_ADDRESS, 'ARB_CONTRACT')
         if amount_in_wei is None:
-            amount_in_wei = int(TRADE_AMOUNT_BASE_TOKEN * (10 ** base_decimals))
+            amount_in_wei = int(TRADE_AMOUNT_BASE_TOKEN * get_token_unit(BASE_CURRENCY_ADDRESS))
 
         # Encode swap data for buy and sell
         buy_data = _encode_swap_data(buy_type, buy_router_info, buy_pool)
@@ -530,25 +1008,20 @@ def execute_trade_atomic(buy_pool, sell_pool, spread, token_address, token_info,
         logging.warning(f"!!! ATOMIC TRADE: {token_name} | {buy_dex_name} -> {sell_dex_name} | Spread: {spread:.2f}% !!!")
 
         # --- REAL EXECUTION ---
-        max_priority_fee = w3.eth.max_priority_fee
-        base_fee = w3.eth.get_block('latest')['baseFeePerGas']
+        # Block base fee, priority fee and nonce in one round trip
+        _, base_fee, max_priority_fee, nonce = resilient_rpc_call(_preflight_reads, [])
+        chain_id = get_chain_id()
         max_fee = base_fee * 2 + max_priority_fee
-        nonce = w3.eth.get_transaction_count(account.address)
-
-        tx = arb_call.build_transaction({
-            'from': account.address,
-            'nonce': nonce,
-            'maxFeePerGas': max_fee,
-            'maxPriorityFeePerGas': max_priority_fee,
-            'gas': MAX_GAS_LIMIT,
-            'chainId': w3.eth.chain_id,
-        })
-
-        signed = w3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-        tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
+
+        arb_route = ('atomic', buy_dex_name, sell_dex_name, token_address)
+        tx = _build_swap_tx(arb_call, nonce, max_fee, max_priority_fee, chain_id, gas=_gas_limit(arb_route))
+
+        signed = account.sign_transaction(tx)
+        tx_hash = _send_raw(signed)
         logging.info(f"  Tx sent: {tx_hash.hex()}")
 
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=TX_RECEIPT_TIMEOUT)
+        receipt = _wait_for_receipt(tx_hash)
+        _record_gas_used(arb_route, receipt)
 
         gas_cost_wei = receipt['gasUsed'] * receipt['effectiveGasPrice']
         gas_cost_eth = gas_cost_wei / (10 ** 18)
@@ -562,6 +1035,58 @@ def execute_trade_atomic(buy_pool, sell_pool, spread, token_address, token_info,
         logging.error(f"Atomic trade error: {e}", exc_info=True)
 
 
+def _report_trade_pnl(amount_in_wei, final_amount_out_wei, buy_receipt, sell_receipt, base_unit, start_trade_time):
+    """Logs the gas cost and the token and net (after gas) profit of a completed buy/sell round trip."""
+    buy_gas_cost_wei = buy_receipt['gasUsed'] * buy_receipt['effectiveGasPrice']
+    sell_gas_cost_wei = sell_receipt['gasUsed'] * sell_receipt['effectiveGasPrice']
+    total_gas_cost_wei = buy_gas_cost_wei + sell_gas_cost_wei
+    total_gas_cost_eth = total_gas_cost_wei / (10**18)  # gas is always in native ETH
+
+    # Token profit (before gas)
+    token_profit_wei = final_amount_out_wei - amount_in_wei
+    token_profit = token_profit_wei / base_unit
+
+    # Net profit (after gas) — convert gas from ETH to base token if needed
+    # On Base, gas is paid in ETH which is also the typical base currency
+    net_profit_wei = token_profit_wei - total_gas_cost_wei
+    net_profit = net_profit_wei / base_unit
+    net_profit_percent = (net_profit_wei / amount_in_wei) * 100 if amount_in_wei > 0 else 0
+
+    logging.info(f"  - Gas costs: buy={buy_gas_cost_wei} wei, sell={sell_gas_cost_wei} wei, total={total_gas_cost_eth:.8f} ETH")
+
+    if net_profit_wei > 0:
+        logging.info(f"  - SUCCESS! Net profit (after gas): {net_profit:.6f} base tokens ({net_profit_percent:+.2f}%).")
+    else:
+        logging.warning(f"  - LOSS (after gas): {abs(net_profit):.6f} base tokens ({net_profit_percent:+.2f}%). Token P&L: {token_profit:.6f}, Gas: -{total_gas_cost_eth:.8f}")
+    logging.info(f"  - Time to perform trades: {time.time() - start_trade_time:.2f}s")
+
+
+def _post_trade_approvals(buy_router_info, sell_router_info, buy_dex_name, sell_dex_name, token_address, token_name):
+    """
+    Some DEXs might require re-approval after each trade, so approvals are ensured for the next
+    potential trade. Allowances approved as unlimited are cached by check_and_approve_token, so
+    these are in-memory no-ops unless a router was never approved.
+    """
+    infinite_approval_amount = MAX_UINT256
+    logging.info("Step 3: Performing post-trade approval checks...")
+
+    # Approve base currency for the buy router
+    logging.info(f"  - Checking approval for base currency on {buy_dex_name} router...")
+    check_and_approve_token(
+        token_address=BASE_CURRENCY_ADDRESS,
+        spender_address=buy_router_info['address'],
+        amount_to_approve_wei=infinite_approval_amount
+    )
+
+    # Approve target token for the sell router
+    logging.info(f"  - Checking approval for {token_name} on {sell_dex_name} router...")
+    check_and_approve_token(
+        token_address=token_address,
+        spender_address=sell_router_info['address'],
+        amount_to_approve_wei=infinite_approval_amount
+    )
+
+
 def execute_trade(buy_pool, sell_pool, spread, token_address, token_info):
     start_trade_time = time.time()
     token_name = token_info.get('name', token_address)
@@ -573,29 +1098,47 @@ def execute_trade(buy_pool, sell_pool, spread, token_address, token_info):
         logging.warning("!!! TRADING SKIPPED: Wallet or trading parameters not configured correctly.")
         return
 
+    if resilient_rpc_call(_orphaned_tx_pending):
+        logging.warning(f"!!! TRADING SKIPPED: Tx {_orphaned_tx[1].hex()} is still queued at nonce {_orphaned_tx[0]}.")
+        return
+
     buy_dex_name = buy_pool['dex']
     sell_dex_name = sell_pool['dex']
-    buy_router_info = find_router_info(buy_dex_name, DEX_ROUTERS, pair_address=buy_pool.get('pairAddress'))
-    sell_router_info = find_router_info(sell_dex_name, DEX_ROUTERS, pair_address=sell_pool.get('pairAddress'))
-    logging.warning(f"Router info for '{buy_dex_name}' and '{sell_dex_name}' returned '{buy_router_info}' and '{sell_router_info}'")
+    buy_router_info = get_pool_router_info(buy_pool)
+    sell_router_info = get_pool_router_info(sell_pool)
+    logging.debug("Router info for '%s' and '%s' returned %r and %r", buy_dex_name, sell_dex_name, buy_router_info, sell_router_info)
 
     if not buy_router_info or not sell_router_info:
         logging.warning(f"!!! TRADING SKIPPED: Router info for '{buy_dex_name}' or '{sell_dex_name}' not found in .env")
         logging.warning(f"!!! TRADING SKIPPED: Debug: Router pair address is '{buy_pool['pairAddress']}' and '{sell_pool['pairAddress']}'")
         return
 
+    # The scan that triggered this trade already proved both pools live
+    _trust_scanned_v3_pool(buy_router_info, buy_pool, BASE_CURRENCY_ADDRESS, token_address)
+    _trust_scanned_v3_pool(sell_router_info, sell_pool, token_address, BASE_CURRENCY_ADDRESS)
+
     try:
         # --- Pre-flight checks ---
         logging.info("  - Performing pre-flight checks...")
-        base_token_contract = w3.eth.contract(address=BASE_CURRENCY_ADDRESS, abi=ERC20_ABI)
-        base_decimals = get_decimals(BASE_CURRENCY_ADDRESS)
-        amount_in_wei = int(TRADE_AMOUNT_BASE_TOKEN * (10**base_decimals))
-        wallet_balance_wei = base_token_contract.functions.balanceOf(account.address).call()
+        base_token_contract = get_contract(BASE_CURRENCY_ADDRESS, 'ERC20')
+        target_token_contract = get_contract(token_address, 'ERC20')
+        base_unit = get_token_unit(BASE_CURRENCY_ADDRESS)
+        target_unit = get_token_unit(token_address)
+        amount_in_wei = int(TRADE_AMOUNT_BASE_TOKEN * base_unit)
+
+        # Both balances (one same-block multicall) plus the block's base fee, the priority fee
+        # and nonce, all in a single round trip
+        (wallet_balance_wei, initial_target_token_balance), base_fee, max_priority_fee, nonce = \
+            resilient_rpc_call(_preflight_reads, [
+                base_token_contract.functions.balanceOf(account.address),
+                target_token_contract.functions.balanceOf(account.address),
+            ])
+        chain_id = get_chain_id()
 
         if wallet_balance_wei < amount_in_wei:
-            logging.warning(f"!!! TRADE SKIPPED: Insufficient balance. Have {wallet_balance_wei / (10**base_decimals):.6f}, need {TRADE_AMOUNT_BASE_TOKEN}.")
+            logging.warning(f"!!! TRADE SKIPPED: Insufficient balance. Have {wallet_balance_wei / base_unit:.6f}, need {TRADE_AMOUNT_BASE_TOKEN}.")
             return
-        logging.info(f"  - Wallet balance check passed. Have {wallet_balance_wei / (10**base_decimals):.6f}, need {TRADE_AMOUNT_BASE_TOKEN}.")
+        logging.info(f"  - Wallet balance check passed. Have {wallet_balance_wei / base_unit:.6f}, need {TRADE_AMOUNT_BASE_TOKEN}.")
 
         # USD-based liquidity impact check (only when USD data is available)
         base_currency_price_usd = buy_pool.get('base_currency_price_usd', 0)
@@ -613,21 +1156,20 @@ def execute_trade(buy_pool, sell_pool, spread, token_address, token_info):
 
         # --- 1. BUY TRANSACTION ---
         logging.info(f"Step 1: Buying {token_name} ({token_address}) on {buy_dex_name} (v{buy_router_info['version']})...")
-        target_token_contract = w3.eth.contract(address=token_address, abi=ERC20_ABI)
-        target_decimals = get_decimals(token_address)
-        initial_target_token_balance = target_token_contract.functions.balanceOf(account.address).call()
-        logging.info(f"  - Initial balance of {token_name}: {initial_target_token_balance / (10**target_decimals):.6f}")
+        logging.info(f"  - Initial balance of {token_name}: {initial_target_token_balance / target_unit:.6f}")
 
         # --- Slippage-protected minimum output for buy ---
-        buy_min_out = _calc_min_amount_out(amount_in_wei, buy_pool['price'], base_decimals, target_decimals)
-        logging.info(f"  - Slippage protection: min output = {buy_min_out / (10**target_decimals):.6f} tokens ({SLIPPAGE_TOLERANCE_PERCENT}% tolerance)")
+        buy_quote = _quote_off_chain(buy_pool, amount_in_wei, selling=False, router_info=buy_router_info)
+        if buy_quote is not None:
+            buy_min_out = _apply_slippage(buy_quote)
+        else:
+            buy_min_out = _calc_min_amount_out(amount_in_wei, buy_pool['price'], base_unit, target_unit)
+        logging.info(f"  - Slippage protection: min output = {buy_min_out / target_unit:.6f} tokens ({SLIPPAGE_TOLERANCE_PERCENT}% tolerance)")
 
         # --- Transaction Preparation ---
-        chain_id = w3.eth.chain_id
         router_type = buy_router_info.get('type', 'uniswap_v2')
 
-        max_priority_fee, max_fee_per_gas = _fresh_gas_params()
-        nonce = w3.eth.get_transaction_count(account.address)
+        max_fee_per_gas = base_fee * 2 + max_priority_fee
 
         swap_function, _ = _build_swap(
             router_type, buy_router_info['version'], buy_dex_name, buy_router_info,
@@ -637,37 +1179,116 @@ def execute_trade(buy_pool, sell_pool, spread, token_address, token_info):
         )
 
         logging.info("  - Building buy transaction...")
-        buy_payload = {
-            'from': account.address, 'nonce': nonce,
-            'maxFeePerGas': max_fee_per_gas, 'maxPriorityFeePerGas': max_priority_fee,
-            'chainId': chain_id
-        }
-        # Gas estimation removed by user request. Using MAX_GAS_LIMIT.
-        buy_payload['gas'] = MAX_GAS_LIMIT
-        buy_txn = swap_function.build_transaction(buy_payload)
-
-        if not buy_txn:
-            raise Exception("Failed to build buy transaction.")
-
-        signed_buy_txn = w3.eth.account.sign_transaction(buy_txn, PRIVATE_KEY)
-        buy_tx_hash = w3.eth.send_raw_transaction(signed_buy_txn.raw_transaction)
+        # Gas estimation removed by user request. The limit comes from the route's past receipts.
+        buy_route = (buy_dex_name, BASE_CURRENCY_ADDRESS, token_address)
+        sell_route = (sell_dex_name, token_address, BASE_CURRENCY_ADDRESS)
+        buy_txn = _build_swap_tx(swap_function, nonce, max_fee_per_gas, max_priority_fee, chain_id,
+                                 gas=_gas_limit(buy_route))
+
+        # Pipelining is only safe while the wallet holds less than buy_min_out of the token:
+        # then the sell can only succeed on top of the buy, and if the buy reverts the sell
+        # reverts with it instead of selling tokens we already held.
+        pipeline_sell = PIPELINE_SELL_LEG and initial_target_token_balance < buy_min_out
+        if PIPELINE_SELL_LEG and not pipeline_sell:
+            logging.info(f"  - Already holding {initial_target_token_balance / target_unit:.6f} {token_name}; "
+                         f"sending the legs one after the other so the sell can't run without the buy.")
+
+        if pipeline_sell:
+            # Sell the buy's guaranteed minimum output with the next nonce and broadcast both
+            # legs together so they can land in the same block. Output above the minimum stays
+            # in the wallet.
+            sell_quote = _quote_off_chain(sell_pool, buy_min_out, selling=True, router_info=sell_router_info)
+            if sell_quote is not None:
+                sell_min_out = _apply_slippage(sell_quote)
+            else:
+                sell_min_out = _calc_min_amount_out_sell(buy_min_out, sell_pool['price'], target_unit, base_unit)
+            sell_swap_function, _ = _build_swap(
+                sell_router_info.get('type', 'uniswap_v2'), sell_router_info['version'], sell_dex_name,
+                sell_router_info, buy_min_out, token_address, BASE_CURRENCY_ADDRESS,
+                pair_address=sell_pool['pairAddress'], fee_bps_hint=sell_pool.get('feeBps'),
+                min_out=sell_min_out
+            )
+            sell_txn = _build_swap_tx(sell_swap_function, nonce + 1, max_fee_per_gas, max_priority_fee, chain_id,
+                                      gas=_gas_limit(sell_route))
+
+            sent_at = time.time()
+            buy_tx_hash, sell_tx_hash = _send_transactions([buy_txn, sell_txn])
+            logging.info(f"  - Buy Tx {buy_tx_hash.hex()} and Sell Tx {sell_tx_hash.hex()} sent together. Waiting for receipts...")
+            buy_receipt, sell_receipt = _wait_for_receipts([buy_tx_hash, sell_tx_hash], sent_at=sent_at)
+            _record_gas_used(buy_route, buy_receipt)
+            _record_gas_used(sell_route, sell_receipt)
+
+            if buy_receipt['status'] == 0:
+                total_gas_cost_wei = sum(r['gasUsed'] * r['effectiveGasPrice'] for r in (buy_receipt, sell_receipt))
+                logging.error(f"  - PIPELINED BUY FAILED (reverted), sell status {sell_receipt['status']}. "
+                              f"Gas lost: {total_gas_cost_wei / 10**18:.8f} ETH")
+                return
+
+            amount_received_wei = _parse_receipt_for_amount_out(
+                buy_receipt, buy_router_info, buy_dex_name, token_address, get_decimals(token_address)
+            )
+            if sell_receipt['status'] == 0:
+                logging.error("  - PIPELINED SELL FAILED. You are now holding the bought tokens.")
+                new_target_token_balance = initial_target_token_balance + amount_received_wei
+                new_base_token_balance = wallet_balance_wei - amount_in_wei
+            else:
+                final_amount_out_wei = _parse_receipt_for_amount_out(
+                    sell_receipt, sell_router_info, sell_dex_name, BASE_CURRENCY_ADDRESS, get_decimals(BASE_CURRENCY_ADDRESS)
+                )
+                new_target_token_balance = initial_target_token_balance + amount_received_wei - buy_min_out
+                new_base_token_balance = wallet_balance_wei - amount_in_wei + final_amount_out_wei
+                logging.info(f"  - Net base tokens received from sell: {final_amount_out_wei / base_unit:.6f}")
+                # Only buy_min_out was sold: value what the buy returned above it at the executed
+                # sell price, or every pipelined trade would report the slippage buffer as a loss
+                kept_wei = amount_received_wei - buy_min_out
+                kept_value_wei = kept_wei * final_amount_out_wei // buy_min_out
+                logging.info(f"  - Kept {kept_wei / target_unit:.6f} {token_name} above the sold minimum, "
+                             f"worth {kept_value_wei / base_unit:.6f} base tokens at the executed sell price")
+                _report_trade_pnl(amount_in_wei, final_amount_out_wei + kept_value_wei, buy_receipt, sell_receipt,
+                                  base_unit, start_trade_time)
+            logging.info(f"  - Amount received from buy: {amount_received_wei / target_unit:.6f} {token_name}")
+            logging.info(f"  - New balance of {token_name}: {new_target_token_balance / target_unit:.6f}")
+            logging.info(f"  - New balance of base token: {new_base_token_balance / base_unit:.6f}")
+
+            _post_trade_approvals(buy_router_info, sell_router_info, buy_dex_name, sell_dex_name,
+                                  token_address, token_name)
+            return
+
+        signed_buy_txn = account.sign_transaction(buy_txn)
+        buy_sent_at = time.time()
+        buy_tx_hash = _send_raw(signed_buy_txn)
         logging.info(f"  - Buy Tx sent: {buy_tx_hash.hex()}. Waiting for receipt...")
-        buy_receipt = w3.eth.wait_for_transaction_receipt(buy_tx_hash, timeout=TX_RECEIPT_TIMEOUT)
+        # Use the block time to prepare the sell leg for the expected buy output, so the
+        # real sell build after the receipt needs no pool reads.
+        _warm_swap(sell_router_info, sell_dex_name, sell_pool, token_address, BASE_CURRENCY_ADDRESS,
+                   buy_quote if buy_quote is not None else buy_min_out)
+        # Sell-side gas prices don't depend on the buy either; the 2x base fee headroom
+        # absorbs the block or two they age before the sell is sent.
+        _, sell_base_fee, sell_max_priority_fee, _ = resilient_rpc_call(_preflight_reads, [], fetch_nonce=False)
+        buy_receipt = _wait_for_receipt(buy_tx_hash, sent_at=buy_sent_at)
+        _record_gas_used(buy_route, buy_receipt)
 
         if buy_receipt['status'] == 0:
             logging.error("  - BUY TRANSACTION FAILED (reverted). Aborting arbitrage.")
             return
 
-        logging.info("  - Buy transaction successful! Checking for balance change...")
-        new_target_token_balance = _wait_for_balance_change(
-            target_token_contract, account.address, initial_target_token_balance
+        logging.info("  - Buy transaction successful! Reading amount received from the receipt...")
+        amount_received_wei = _parse_receipt_for_amount_out(
+            buy_receipt, buy_router_info, buy_dex_name, token_address, get_decimals(token_address)
         )
-        amount_received_wei = new_target_token_balance - initial_target_token_balance
-        logging.info(f"  - New balance of {token_name}: {new_target_token_balance / (10**target_decimals):.6f}")
-        logging.info(f"  - Amount received: {amount_received_wei / (10**target_decimals):.6f}")
+        if amount_received_wei > 0:
+            new_target_token_balance = initial_target_token_balance + amount_received_wei
+        else:
+            logging.info("  - No transfer to us in the receipt, checking for balance change...")
+            new_target_token_balance = _wait_for_balance_change(
+                target_token_contract, account.address, initial_target_token_balance
+            )
+            amount_received_wei = new_target_token_balance - initial_target_token_balance
+        logging.info(f"  - New balance of {token_name}: {new_target_token_balance / target_unit:.6f}")
+        logging.info(f"  - Amount received: {amount_received_wei / target_unit:.6f}")
 
         if amount_received_wei > 0:
-            executed_buy_price = (amount_in_wei / 10**base_decimals) / (amount_received_wei / 10**target_decimals)
+            executed_buy_price = (amount_in_wei / base_unit) / (amount_received_wei / target_unit)
             theoretical_buy_price = buy_pool['price']
             price_diff_pct = ((executed_buy_price - theoretical_buy_price) / theoretical_buy_price) * 100 if theoretical_buy_price > 0 else 0
             logging.info(f"  - Executed buy price: {executed_buy_price:.8f} vs Theoretical: {theoretical_buy_price:.8f} ({price_diff_pct:+.2f}%)")
@@ -677,18 +1298,24 @@ def execute_trade(buy_pool, sell_pool, spread, token_address, token_info):
             return
 
         # --- 2. SELL TRANSACTION ---
-        logging.info(f"Step 2: Selling {amount_received_wei / (10**target_decimals)} of {token_name} ({token_address}) on {sell_dex_name} (v{sell_router_info['version']})...")
+        logging.info(f"Step 2: Selling {amount_received_wei / target_unit} of {token_name} ({token_address}) on {sell_dex_name} (v{sell_router_info['version']})...")
 
-        initial_base_token_balance = base_token_contract.functions.balanceOf(account.address).call()
-        logging.info(f"  - Initial balance of base token: {initial_base_token_balance / (10**base_decimals):.6f}")
+        # The buy was mined with `nonce`, so the sell's nonce is known without asking the node,
+        # and an exact-input buy spent exactly amount_in_wei of the pre-flight base balance.
+        sell_nonce = nonce + 1
+        initial_base_token_balance = wallet_balance_wei - amount_in_wei
+        logging.info(f"  - Initial balance of base token: {initial_base_token_balance / base_unit:.6f}")
 
         # --- Slippage-protected minimum output for sell ---
-        sell_min_out = _calc_min_amount_out_sell(amount_received_wei, sell_pool['price'], target_decimals, base_decimals)
-        logging.info(f"  - Slippage protection: min output = {sell_min_out / (10**base_decimals):.6f} base tokens ({SLIPPAGE_TOLERANCE_PERCENT}% tolerance)")
+        sell_quote = _quote_off_chain(sell_pool, amount_received_wei, selling=True, router_info=sell_router_info)
+        if sell_quote is not None:
+            sell_min_out = _apply_slippage(sell_quote)
+        else:
+            sell_min_out = _calc_min_amount_out_sell(amount_received_wei, sell_pool['price'], target_unit, base_unit)
+        logging.info(f"  - Slippage protection: min output = {sell_min_out / base_unit:.6f} base tokens ({SLIPPAGE_TOLERANCE_PERCENT}% tolerance)")
 
-        # --- Refresh gas prices for sell transaction ---
-        sell_max_priority_fee, sell_max_fee_per_gas = _fresh_gas_params()
-        sell_nonce = w3.eth.get_transaction_count(account.address)
+        # --- Gas prices for the sell transaction (read while the buy was being mined) ---
+        sell_max_fee_per_gas = sell_base_fee * 2 + sell_max_priority_fee
 
         router_type_sell = sell_router_info.get('type', 'uniswap_v2')
         sell_swap_function, _ = _build_swap(
@@ -699,86 +1326,47 @@ def execute_trade(buy_pool, sell_pool, spread, token_address, token_info):
         )
 
         logging.info("  - Building sell transaction...")
-        sell_payload = {
-            'from': account.address, 'nonce': sell_nonce,
-            'maxFeePerGas': sell_max_fee_per_gas, 'maxPriorityFeePerGas': sell_max_priority_fee,
-            'chainId': chain_id
-        }
-        # Gas estimation removed by user request. Using MAX_GAS_LIMIT.
-        sell_payload['gas'] = MAX_GAS_LIMIT
-        sell_txn = sell_swap_function.build_transaction(sell_payload)
-
-        if not sell_txn:
-            raise Exception("Failed to build sell transaction.")
-
-        signed_sell_txn = w3.eth.account.sign_transaction(sell_txn, PRIVATE_KEY)
-        sell_tx_hash = w3.eth.send_raw_transaction(signed_sell_txn.raw_transaction)
+        # Gas estimation removed by user request. The limit comes from the route's past receipts.
+        sell_txn = _build_swap_tx(sell_swap_function, sell_nonce, sell_max_fee_per_gas, sell_max_priority_fee, chain_id,
+                                  gas=_gas_limit(sell_route))
+
+        signed_sell_txn = account.sign_transaction(sell_txn)
+        sell_tx_hash = _send_raw(signed_sell_txn)
         logging.info(f"  - Sell Tx sent: {sell_tx_hash.hex()}. Waiting for receipt...")
-        sell_receipt = w3.eth.wait_for_transaction_receipt(sell_tx_hash, timeout=TX_RECEIPT_TIMEOUT)
+        sell_receipt = _wait_for_receipt(sell_tx_hash)
+        _record_gas_used(sell_route, sell_receipt)
 
         if sell_receipt['status'] == 0:
             logging.error("  - SELL TRANSACTION FAILED. You are now holding the bought tokens.")
         else:
-            logging.info("  - Sell transaction successful! Checking for balance change...")
-            new_base_token_balance = _wait_for_balance_change(
-                base_token_contract, account.address, initial_base_token_balance
+            logging.info("  - Sell transaction successful! Reading amount received from the receipt...")
+            final_amount_out_wei = _parse_receipt_for_amount_out(
+                sell_receipt, sell_router_info, sell_dex_name, BASE_CURRENCY_ADDRESS, get_decimals(BASE_CURRENCY_ADDRESS)
             )
-            # final_amount_out_wei is the net change in balance from the sell transaction.
-            final_amount_out_wei = new_base_token_balance - initial_base_token_balance
-            logging.info(f"  - New balance of base token: {new_base_token_balance / (10**base_decimals):.6f}")
-            logging.info(f"  - Net base tokens received from sell: {final_amount_out_wei / (10**base_decimals):.6f}")
+            if final_amount_out_wei > 0:
+                new_base_token_balance = initial_base_token_balance + final_amount_out_wei
+            else:
+                logging.info("  - No transfer to us in the receipt, checking for balance change...")
+                new_base_token_balance = _wait_for_balance_change(
+                    base_token_contract, account.address, initial_base_token_balance
+                )
+                # final_amount_out_wei is the net change in balance from the sell transaction.
+                final_amount_out_wei = new_base_token_balance - initial_base_token_balance
+            logging.info(f"  - New balance of base token: {new_base_token_balance / base_unit:.6f}")
+            logging.info(f"  - Net base tokens received from sell: {final_amount_out_wei / base_unit:.6f}")
 
             if amount_received_wei > 0 and final_amount_out_wei > 0:
-                executed_sell_price = (final_amount_out_wei / 10**base_decimals) / (amount_received_wei / 10**target_decimals)
+                executed_sell_price = (final_amount_out_wei / base_unit) / (amount_received_wei / target_unit)
                 theoretical_sell_price = sell_pool['price']
                 price_diff_pct = ((executed_sell_price - theoretical_sell_price) / theoretical_sell_price) * 100 if theoretical_sell_price > 0 else 0
                 logging.info(f"  - Executed sell price: {executed_sell_price:.8f} vs Theoretical: {theoretical_sell_price:.8f} ({price_diff_pct:+.2f}%)")
 
-            # Profit calculation including gas costs
-            buy_gas_cost_wei = buy_receipt['gasUsed'] * buy_receipt['effectiveGasPrice']
-            sell_gas_cost_wei = sell_receipt['gasUsed'] * sell_receipt['effectiveGasPrice']
-            total_gas_cost_wei = buy_gas_cost_wei + sell_gas_cost_wei
-            total_gas_cost_eth = total_gas_cost_wei / (10**18)  # gas is always in native ETH
-
-            # Token profit (before gas)
-            token_profit_wei = final_amount_out_wei - amount_in_wei
-            token_profit = token_profit_wei / (10**base_decimals)
-
-            # Net profit (after gas) — convert gas from ETH to base token if needed
-            # On Base, gas is paid in ETH which is also the typical base currency
-            net_profit_wei = token_profit_wei - total_gas_cost_wei
-            net_profit = net_profit_wei / (10**base_decimals)
-            net_profit_percent = (net_profit_wei / amount_in_wei) * 100 if amount_in_wei > 0 else 0
-
-            logging.info(f"  - Gas costs: buy={buy_gas_cost_wei} wei, sell={sell_gas_cost_wei} wei, total={total_gas_cost_eth:.8f} ETH")
-
-            if net_profit_wei > 0:
-                logging.info(f"  - SUCCESS! Net profit (after gas): {net_profit:.6f} base tokens ({net_profit_percent:+.2f}%).")
-            else:
-                logging.warning(f"  - LOSS (after gas): {abs(net_profit):.6f} base tokens ({net_profit_percent:+.2f}%). Token P&L: {token_profit:.6f}, Gas: -{total_gas_cost_eth:.8f}")
-            logging.info(f"  - Time to perform trades: {time.time() - start_trade_time:.2f}s")
+            _report_trade_pnl(amount_in_wei, final_amount_out_wei, buy_receipt, sell_receipt, base_unit,
+                              start_trade_time)
 
         # --- 3. POST-TRADE APPROVALS ---
-        # Some DEXs might require re-approval after each trade.
-        # We ensure approvals are set for the next potential trade.
-        infinite_approval_amount = 2**256 - 1
-        logging.info("Step 3: Performing post-trade approval checks...")
-
-        # Approve base currency for the buy router
-        logging.info(f"  - Checking approval for base currency on {buy_dex_name} router...")
-        check_and_approve_token(
-            token_address=BASE_CURRENCY_ADDRESS,
-            spender_address=buy_router_info['address'],
-            amount_to_approve_wei=infinite_approval_amount
-        )
-
-        # Approve target token for the sell router
-        logging.info(f"  - Checking approval for {token_name} on {sell_dex_name} router...")
-        check_and_approve_token(
-            token_address=token_address,
-            spender_address=sell_router_info['address'],
-            amount_to_approve_wei=infinite_approval_amount
-        )
+        _post_trade_approvals(buy_router_info, sell_router_info, buy_dex_name, sell_dex_name,
+                              token_address, token_name)
 
     except Exception as e:
         logging.error(f"An unexpected error occurred during trade execution: {e}", exc_info=True)